@@ -47,6 +47,15 @@ _KANA_CHAR_RE = re.compile(r"[\u3040-\u309F\u30A0-\u30FF]")
 _KANA_RATIO_BASE_RE = re.compile(
     r"[A-Za-z0-9\u3040-\u309F\u30A0-\u30FF\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF]"
 )
+# Formatting rules that merge or re-space lines; dropped for subtitle inputs.
+_MELT_PATTERNS = frozenset(
+    (
+        "ensure_single_newline",
+        "ensure_double_newline",
+        "clean_empty_lines",
+        "merge_short_lines",
+    )
+)
 
 
 class PipelineStopRequested(RuntimeError):
@@ -446,18 +455,12 @@ class PipelineRunner:
         lower_input = str(input_path or "").lower()
         if not lower_input.endswith((".srt", ".ass", ".ssa")):
             return list(post_rules or [])
-        melt_patterns = {
-            "ensure_single_newline",
-            "ensure_double_newline",
-            "clean_empty_lines",
-            "merge_short_lines",
-        }
         sanitized: List[Dict[str, Any]] = []
         for rule in post_rules or []:
             if not isinstance(rule, dict):
                 continue
             pattern = str(rule.get("pattern") or "").strip().lower()
-            if pattern in melt_patterns:
+            if pattern in _MELT_PATTERNS:
                 continue
             sanitized.append(rule)
         return sanitized
@@ -7,7 +7,7 @@ Translation Cache - 翻译缓存模块
 import json
 import os
 import threading  # [修复] 并发安全
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional, Sequence
 from dataclasses import dataclass, field
 
 
@@ -100,29 +100,53 @@ class TranslationCache:
         self._lock = threading.Lock()
     
     def add_block(self, index: int, src: str, dst: str,
-                  warnings: List[str] = None, cot: str = '', retry_history: List[Dict] = None) -> CacheBlock:
-        """添加翻译 block，如果索引已存在则替换（线程安全，O(1)查找）"""
+                  warnings: Sequence[str] = None, cot: str = '', retry_history: List[Dict] = None) -> CacheBlock:
+        """添加翻译 block，如果索引已存在则替换（线程安全，O(1)查找）；warnings 可为 list 或 tuple"""
         block = CacheBlock(
             index=index,
             src=src,
             dst=dst,
             status='processed',
-            warnings=warnings or [],
+            warnings=warnings if warnings is not None else [],
             cot=cot,
             retry_history=retry_history or []
         )
         # [并发安全] 使用锁保护 blocks 和 _index_map 的并发修改
         with self._lock:
-            # 使用字典索引进行 O(1) 查找
-            if index in self._index_map:
-                # 已存在，替换
-                pos = self._index_map[index]
-                self.blocks[pos] = block
-            else:
-                # 不存在，追加
-                self.blocks.append(block)
-                self._index_map[index] = len(self.blocks) - 1
+            self._put_block(block)
         return block
+
+    def add_blocks(self, entries: Iterable[tuple]) -> List[CacheBlock]:
+        """批量添加 block，整批只加锁一次。entries 中每项与 add_block 的位置参数一致"""
+        new_blocks = [
+            CacheBlock(
+                index=entry[0],
+                src=entry[1],
+                dst=entry[2],
+                status='processed',
+                warnings=entry[3] if len(entry) > 3 and entry[3] is not None else [],
+                cot=entry[4] if len(entry) > 4 else '',
+                retry_history=(entry[5] if len(entry) > 5 else None) or []
+            )
+            for entry in entries
+        ]
+        if new_blocks:
+            with self._lock:
+                for block in new_blocks:
+                    self._put_block(block)
+        return new_blocks
+
+    def _put_block(self, block: CacheBlock) -> None:
+        """写入或替换 block（调用方须持有 self._lock）"""
+        # 使用字典索引进行 O(1) 查找
+        if block.index in self._index_map:
+            # 已存在，替换
+            pos = self._index_map[block.index]
+            self.blocks[pos] = block
+        else:
+            # 不存在，追加
+            self.blocks.append(block)
+            self._index_map[block.index] = len(self.blocks) - 1
     
     def save(
         self,
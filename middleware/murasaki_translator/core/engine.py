@@ -48,13 +48,18 @@ class InferenceEngine:
         self.base_url = f"http://{host}:{port}"
         self.session = requests.Session()
         self.process = None
+        self._process_lock = threading.RLock()  # 串行化进程的创建与停止
         
         # Real-time stats counters (Atomic-like usage in GIL)
         self.generated_chars_count = 0
         self.generated_tokens_count = 0
 
 
-    def start_server(self):
+    def start_server(self, cancel: Optional[threading.Event] = None):
+        """
+        启动 llama-server 并等待就绪。cancel 在创建进程前已被置位时不再启动（直接返回）；
+        检查与创建进程在同一把锁内完成，与 stop_server 互斥，因此置位 cancel 后调用 stop_server 不会漏掉进程。
+        """
         if self.no_spawn:
             logger.info("External server mode enabled. Skipping server spawn.")
             self._wait_for_ready()
@@ -113,11 +118,15 @@ class InferenceEngine:
         
         logger.info(f"[GPU Config] n_gpu_layers={self.n_gpu_layers} (0=CPU only, -1=All layers to GPU)")
         
-        # 将输出重定向到 server.log，保持 GUI 日志清洁
-        self.server_log = open("server.log", "w", encoding='utf-8')
-        self.process = subprocess.Popen(cmd, stdout=self.server_log, stderr=self.server_log) 
+        with self._process_lock:
+            if cancel is not None and cancel.is_set():
+                logger.info("Server start cancelled before spawn.")
+                return
+            # 将输出重定向到 server.log，保持 GUI 日志清洁
+            self.server_log = open("server.log", "w", encoding='utf-8')
+            self.process = subprocess.Popen(cmd, stdout=self.server_log, stderr=self.server_log) 
 
-        atexit.register(self.stop_server)
+            atexit.register(self.stop_server)
         self._wait_for_ready()
         
     def _wait_for_ready(self, timeout=180):
@@ -164,34 +173,35 @@ class InferenceEngine:
         if self.no_spawn:
             return
 
-        if self.process:
-            pid = self.process.pid
-            logger.info(f"Stopping server (PID: {pid})...")
-            try:
-                self.process.terminate()
+        with self._process_lock:
+            if self.process:
+                pid = self.process.pid
+                logger.info(f"Stopping server (PID: {pid})...")
                 try:
-                    self.process.wait(timeout=3)
-                except subprocess.TimeoutExpired:
-                     logger.warning("Server terminate timeout, forcing kill...")
-                     self.process.kill()
-                     self.process.wait()
-            except Exception as e:
-                logger.error(f"Error stopping server: {e}")
+                    self.process.terminate()
+                    try:
+                        self.process.wait(timeout=3)
+                    except subprocess.TimeoutExpired:
+                         logger.warning("Server terminate timeout, forcing kill...")
+                         self.process.kill()
+                         self.process.wait()
+                except Exception as e:
+                    logger.error(f"Error stopping server: {e}")
             
-            # Windows specific: ensure llama-server is 100% killed
-            if os.name == 'nt':
-                try:
-                    # Hide the CMD window for taskkill
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = 0 # SW_HIDE
+                # Windows specific: ensure llama-server is 100% killed
+                if os.name == 'nt':
+                    try:
+                        # Hide the CMD window for taskkill
+                        startupinfo = subprocess.STARTUPINFO()
+                        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                        startupinfo.wShowWindow = 0 # SW_HIDE
                     
-                    subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], 
-                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                 startupinfo=startupinfo)
-                except: pass
+                        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], 
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     startupinfo=startupinfo)
+                    except: pass
                 
-            self.process = None
+                self.process = None
             
         if hasattr(self, 'session') and self.session:
              try:
@@ -294,7 +304,7 @@ class InferenceEngine:
                 )
                 response.raise_for_status()
                 
-                full_reasoning = ""
+                reasoning_parts = []  # 推理内容流式期间不参与检测，结束时一次 join
                 full_text = ""
                 loop_detected = False
                 
@@ -321,7 +331,7 @@ class InferenceEngine:
                             content = delta.get('content', '')
                             
                             if reasoning:
-                                full_reasoning += reasoning
+                                reasoning_parts.append(reasoning)
                                 # Count reasoning tokens (fallback)
                                 if local_last_usage is None:
                                     local_token_count += 1
@@ -430,6 +440,7 @@ class InferenceEngine:
                     
                     # Success or Final Fail -> Return Result
                     final_text = full_text
+                    full_reasoning = "".join(reasoning_parts)
                     if full_reasoning:
                         final_text = f"<think>{full_reasoning}</think>\n{full_text}"
                     
@@ -5,9 +5,52 @@ Text Protector - 文本保护模块
 """
 
 import re
+from functools import lru_cache
 from typing import List, Dict
 
 
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> "re.Pattern":
+    """编译保护模式（跨 TextProtector 实例共享；无效模式抛出 re.error，不会被缓存）"""
+    return re.compile(pattern)
+
+
+_PLACEHOLDER_INDEX_RE = re.compile(r'(\d+)')
+
+# 数字和下划线、字母的全角转换表
+_MANGLE_TABLE = str.maketrans(
+    "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_@#!$%^&*()[]{}<>",
+    "０１２３４５６７８９ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ＿＠＃！＄％＾＆＊（）［］｛｝＜＞"
+)
+
+
+@lru_cache(maxsize=1024)
+def _compile_fuzzy_placeholder(placeholder: str, aggressive_cleaning: bool) -> "re.Pattern":
+    """
+    针对 @P{N}@ 格式构造并编译模糊正则（同一占位符在各块间反复出现，结果缓存）。
+    允许在 @ 符号和数字之间有任意空格，允许全半角混杂：
+    能匹配 @P1@, @ P 1 @, ＠Ｐ１＠, ＠　Ｐ　１　＠
+    """
+    # 把每个字符都变成 [字符|全角字符]\s*
+    fuzzy_pattern = ""
+    for i, char in enumerate(placeholder):
+        fw_char = char.translate(_MANGLE_TABLE)
+        if char == fw_char:
+            char_part = re.escape(char)
+        else:
+            char_part = f"[{re.escape(char)}{re.escape(fw_char)}]"
+        
+        # Logic for appending space consumer
+        # If aggressive_cleaning is False (SRT/TXT), we DO NOT consume trailing spaces
+        # to preserve structural newlines or intended spaces.
+        is_last = (i == len(placeholder) - 1)
+        if is_last and not aggressive_cleaning:
+            fuzzy_pattern += char_part
+        else:
+            fuzzy_pattern += char_part + r"\s*"
+    return re.compile(fuzzy_pattern.strip())
+
+
 class TextProtector:
     """
     文本保护器：将匹配正则表达式的文本替换为占位符。
@@ -94,7 +137,7 @@ class TextProtector:
                     self.replacements[placeholder] = original
                     return placeholder
                 
-                result = re.sub(pattern, replace_match, result)
+                result = _compile_pattern(pattern).sub(replace_match, result)
             except re.error as e:
                 print(f"[TextProtector] Invalid pattern '{pattern}': {e}")
                 continue
@@ -115,7 +158,7 @@ class TextProtector:
         # 假设格式是 @P{index}@
         items = []
         for placeholder, original in self.replacements.items():
-            match = re.search(r'(\d+)', placeholder)
+            match = _PLACEHOLDER_INDEX_RE.search(placeholder)
             idx = int(match.group(1)) if match else 0
             items.append((idx, placeholder, original))
         
@@ -127,33 +170,13 @@ class TextProtector:
             # 核心修复：之前的 strict replace 无法消除模型在占位符后插入的空格
             # 现在的正则会自动吞噬占位符后的所有空白 (\s*)
             
-            # 针对 @P{N}@ 格式构造一个模糊正则
-            # 允许在 @ 符号和数字之间有任意空格，允许全半角混杂
-            safe_placeholder = re.escape(placeholder) # e.g. \@P1\@
-            # 构造一个能匹配 @P1@, @ P 1 @, ＠Ｐ１＠, ＠　Ｐ　１　＠ 的正则
-            # 把每个字符都变成 [字符|全角字符]\s*
-            fuzzy_pattern = ""
-            for i, char in enumerate(placeholder):
-                fw_char = self._to_mangled_potential(char)
-                if char == fw_char:
-                    char_part = re.escape(char)
-                else:
-                    char_part = f"[{re.escape(char)}{re.escape(fw_char)}]"
-                
-                # Logic for appending space consumer
-                # If aggressive_cleaning is False (SRT/TXT), we DO NOT consume trailing spaces
-                # to preserve structural newlines or intended spaces.
-                is_last = (i == len(placeholder) - 1)
-                if is_last and not self.aggressive_cleaning:
-                    fuzzy_pattern += char_part
-                else:
-                    fuzzy_pattern += char_part + r"\s*"
-            
+            # 针对 @P{N}@ 格式构造一个模糊正则（见 _compile_fuzzy_placeholder）
             try:
                 # 使用这个模糊正则寻找并替换
                 # CRITICAL FIX: Use lambda for replacement to prevent regex driver from
                 # interpreting backslashes in the 'original' string (e.g. {\pos} -> {os})
-                result = re.sub(fuzzy_pattern.strip(), lambda m: original, result)
+                fuzzy_re = _compile_fuzzy_placeholder(placeholder, self.aggressive_cleaning)
+                result = fuzzy_re.sub(lambda m: original, result)
             except:
                 # Fallback to strict if regex fails for some reason
                 if placeholder in result:
@@ -165,12 +188,7 @@ class TextProtector:
         """
         转换字符串为可能的被损坏后的形式（全角化）。
         """
-        # 数字和下划线、字母的全角转换表
-        table = str.maketrans(
-            "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_@#!$%^&*()[]{}<>",
-            "０１２３４５６７８９ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ＿＠＃！＄％＾＆＊（）［］｛｝＜＞"
-        )
-        return s.translate(table)
+        return s.translate(_MANGLE_TABLE)
     
     def get_stats(self) -> Dict:
         """获取保护统计信息"""
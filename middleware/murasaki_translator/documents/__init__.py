@@ -3,4 +3,11 @@ from .factory import DocumentFactory
 from .txt import TxtDocument
 from .srt import SrtDocument
 from .ass import AssDocument
-from .epub import EpubDocument
+
+
+def __getattr__(name):
+    # EpubDocument 依赖 bs4（导入开销较大），仅在首次访问时加载
+    if name == "EpubDocument":
+        from .epub import EpubDocument
+        return EpubDocument
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
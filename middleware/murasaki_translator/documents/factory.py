@@ -5,7 +5,6 @@ from .base import BaseDocument
 from .txt import TxtDocument
 from .srt import SrtDocument
 from .ass import AssDocument
-from .epub import EpubDocument
 
 class DocumentFactory:
     @staticmethod
@@ -17,6 +16,8 @@ class DocumentFactory:
         elif ext in ['.ass', '.ssa']:
             return AssDocument(path)
         elif ext == '.epub':
+            # 延迟导入：bs4 只在处理 EPUB 时加载
+            from .epub import EpubDocument
             return EpubDocument(path)
         else:
             # Default to TXT (supports .txt, .md, etc.)
@@ -34,6 +34,9 @@ class Normalizer:
         "ﾞ": "゛", "ﾟ": "゜",
     })
 
+    # str.translate 用映射表（C 层逐字符替换，代替逐字符 dict.get + join）
+    _TRANSLATE_TABLE = str.maketrans(CUSTOM_RULE)
+
     @classmethod
     def normalize(cls, text: str) -> str:
         """
@@ -42,13 +45,14 @@ class Normalizer:
         - 全角字母数字转半角
         - 半角假名转全角
         """
-        if not text:
+        if not text or text.isascii():
+            # 纯 ASCII 文本已是 NFC，且不含任何需转换的全角/半角字符
             return text
         
         # Unicode NFC 正规化
         text = unicodedata.normalize("NFC", text)
         
         # 应用自定义规则
-        text = "".join([cls.CUSTOM_RULE.get(char, char) for char in text])
+        text = text.translate(cls._TRANSLATE_TABLE)
         
         return text
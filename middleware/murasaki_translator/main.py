@@ -4,15 +4,22 @@ import sys
 import os
 import time
 import json
+import hashlib
 import re
 import subprocess
 import threading
+import platform
+import traceback
 import shutil  # [修复] 用于备份损坏的缓存文件
 from contextlib import nullcontext
-from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import SimpleQueue
 
 from pathlib import Path
+from json.encoder import encode_basestring as _json_str  # 与 json.dumps(s, ensure_ascii=False) 输出一致的 C 实现
 import logging
 
 # Module-level logger for all functions (fixes NameError in nested functions)
@@ -28,16 +35,57 @@ sys.stderr.reconfigure(encoding='utf-8')
 # Global Lock for thread-safe printing to stdout
 stdout_lock = threading.Lock()
 
+def _json_event_line(prefix, data) -> str:
+    return f"\n{prefix}:{_dumps_json_line(data)}\n"
+
 def safe_print_json(prefix, data):
-    """Thread-safe JSON printing to stdout."""
+    """Thread-safe JSON printing to stdout (compact payload, serialized outside the lock)."""
+    line = _json_event_line(prefix, data)
+    with stdout_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+def safe_print_json_batch(events):
+    """Thread-safe printing of several (prefix, data) events with a single write + flush."""
+    if not events:
+        return
+    text = "".join([_json_event_line(prefix, data) for prefix, data in events])
     with stdout_lock:
-        sys.stdout.write(f"\n{prefix}:{json.dumps(data, ensure_ascii=False)}\n")
+        sys.stdout.write(text)
         sys.stdout.flush()
 
+def _dumps_json_line(obj) -> str:
+    """单行 JSON 序列化（JSON_RESULT / 续翻进度）：安装 orjson 时走其 C 实现，否则回退标准库（同为紧凑、不转义非 ASCII）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            pass  # orjson 不支持的类型（如非 str 键）交给标准库
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+def _dumps_json_bytes(obj) -> bytes:
+    """同 _dumps_json_line，但直接返回 UTF-8 字节（供二进制写入的续翻进度文件，省去 decode/encode 往返）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _loads_json_line(line):
+    """单行 JSON 解析：优先 orjson；其拒绝的输入（如标准库写出的 NaN）回退标准库，仍失败则抛 ValueError"""
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except ValueError:
+            pass
+    return json.loads(line)
+
 def safe_print(msg):
-    """Thread-safe generic printing."""
+    """Thread-safe generic printing (one write call per message, same output as print)."""
+    line = f"{msg}\n"
     with stdout_lock:
-        print(msg)
+        sys.stdout.write(line)
 
 def _estimate_cot_ratio_for_ctx(ctx_value: int) -> float:
     if ctx_value >= 8192:
@@ -60,6 +108,21 @@ def _estimate_ctx_for_chunk_limit(chunk_chars: int) -> int:
     return 20000
 
 
+# KV Cache 每元素字节数（q8_0/q5_1/q4_0 含块缩放因子开销）
+_KV_BYTES_PER_ELEM = {"f16": 2.0, "q8_0": 34 / 32, "q5_1": 24 / 32, "q4_0": 18 / 32}
+
+def _estimate_max_parallel_slots(vram_mb: int, model_bytes: int, ctx_value: int,
+                                 kv_cache_type: str = "f16", n_layer: int = 36,
+                                 kv_dim: int = 1024, reserve_mb: int = 1024) -> int:
+    """按显存余量估算可容纳的并发槽数（默认按 8B GQA 模型：36 层、8 KV heads x 128 dim）"""
+    per_elem = _KV_BYTES_PER_ELEM.get(kv_cache_type, 2.0)
+    kv_slot_bytes = ctx_value * n_layer * 2 * kv_dim * per_elem
+    free_bytes = (vram_mb - reserve_mb) * 1024 * 1024 - model_bytes
+    if kv_slot_bytes <= 0 or free_bytes <= 0:
+        return 1
+    return max(1, int(free_bytes // kv_slot_bytes))
+
+
 from murasaki_translator.core.chunker import Chunker, TextBlock
 from murasaki_translator.core.prompt import PromptBuilder
 from murasaki_translator.core.engine import InferenceEngine
@@ -74,14 +137,46 @@ from murasaki_translator.fixer import NumberFixer, Normalizer, PunctuationFixer,
 from murasaki_translator.documents import DocumentFactory
 from murasaki_translator.utils.alignment_handler import AlignmentHandler
 
+try:
+    import orjson  # 可选：JSON_RESULT 序列化加速
+except ImportError:
+    orjson = None
+
+try:
+    import inotify_simple  # 可选（Linux）：暂停期间等待文件删除事件而非轮询
+except ImportError:
+    inotify_simple = None
+
 V1_KANA_RETRY_THRESHOLD = 0.30
+_EMPTY_WARNINGS = ()  # 无警告块共享的空 warning 类型序列，避免逐块分配
+OUTPUT_BUFFER_SIZE = 1 << 20  # 输出文件写缓冲，按批 flush 而非逐行
+OUTPUT_FLUSH_BLOCKS = 16      # 单次有序写出中每累计多少块写入一次文件缓冲
+OUTPUT_FLUSH_SECS = 2.0       # 输出/CoT 文件距上次 flush 超过该秒数才 flush（文件关闭时总会 flush）
+_COT_HEADER_FMT = "[MURASAKI] ========== Block {} ==========\n".format
+TEMP_PROGRESS_FLUSH_BLOCKS = 100  # 续翻进度 (.temp.jsonl) 每累计多少块落盘一次
+TEMP_PROGRESS_FLUSH_SECS = 5.0    # 或距上次落盘超过该秒数
+THINK_DELTA_FLUSH_SECS = 0.05    # 思考流增量的合并写出间隔
+SUBMIT_WINDOW_PER_WORKER = 2      # 每个并发槽位在执行器中最多排队的任务数（提交背压）
+PRE_RULE_CACHE_SIZE = 2048        # 单次任务内前处理结果缓存条数（键为块原文 + strict 标志）
 _KANA_CHAR_RE = re.compile(r"[\u3040-\u30FF\u31F0-\u31FF]")
-_NON_SPACE_RE = re.compile(r"\S")
+# 锚点检测 / 归一化用正则（逐块调用，预编译于模块级）
+# 先用 translate 把锚点可能出现的全角字符折叠为 ASCII，再用纯 ASCII 正则修复空白
+_ANCHOR_FULLWIDTH = str.maketrans("０１２３４５６７８９＠＝ｉｄｅｎＩＤＥＮ", "0123456789@=idenIDEN")
+_MANGLED_ID_RE = re.compile(r"@\s*[iI]\s*[dD]\s*=\s*([0-9]+)\s*@")
+_MANGLED_END_RE = re.compile(r"@\s*[eE]\s*[nN]\s*[dD]\s*=\s*([0-9]+)\s*@")
+_ANCHOR_ID_RE = re.compile(r"@id=(\d+)@")
+_ANCHOR_END_RE = re.compile(r"@end=(\d+)@")
+# 时间轴为纯 ASCII：re.ASCII 让 \d/\s 走 ASCII 快路径，也不把全角数字误判为有效时间轴
+_TIMECODE_RE = re.compile(r"\d{2}:\d{2}:\d{2}[,\.]\d{1,3}\s*[-=]+>\s*\d{2}:\d{2}:\d{2}[,\.]\d{1,3}", re.ASCII)
+# 单块重翻引擎缓存：启动参数 -> 已启动的 InferenceEngine
+_ENGINE_CACHE: Dict[tuple, InferenceEngine] = {}
+_ENGINE_CACHE_LOCK = threading.RLock()
 
 
 def _calculate_kana_ratio(text: str) -> tuple:
     normalized = str(text or "")
-    effective_chars = len(_NON_SPACE_RE.findall(normalized))
+    # str.split() 与 \S 采用同一套 Unicode 空白定义，在 C 层完成去空白计数
+    effective_chars = len("".join(normalized.split()))
     if effective_chars <= 0:
         return 0.0, 0, 0
     kana_chars = len(_KANA_CHAR_RE.findall(normalized))
@@ -117,7 +212,8 @@ def load_glossary(path: Optional[str]) -> Dict[str, str]:
         
         # Case 1: Standard Dict format {"src": "dst"}
         if isinstance(data, dict):
-            return {str(k): str(v) for k, v in data.items() if k and v}
+            # JSON 对象的键必为 str；值通常已是 str，仅对数字等非字符串值做转换
+            return {k: v if type(v) is str else str(v) for k, v in data.items() if k and v}
         
         # Case 2: List of objects
         elif isinstance(data, list):
@@ -144,6 +240,19 @@ def load_glossary(path: Optional[str]) -> Dict[str, str]:
         print(f"[Warning] Failed to load glossary {os.path.basename(path)}: {e}")
         return {}
 
+def _resolve_glossary_path(glossary_path: str) -> Optional[str]:
+    """
+    依次尝试：原路径 -> 脚本目录下 glossaries/ -> 当前目录下 glossaries/，命中即停止探测。
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    candidates = (
+        glossary_path,
+        os.path.join(script_dir, 'glossaries', glossary_path),
+        os.path.join('glossaries', glossary_path),
+    )
+    return next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+
+
 def load_rules(path: Optional[str]) -> List[Dict]:
     """Load rules from JSON file."""
     if not path or not os.path.exists(path):
@@ -156,35 +265,194 @@ def load_rules(path: Optional[str]) -> List[Dict]:
         return []
 
 
-def load_existing_output(output_path: str) -> tuple:
+def _wait_while_paused(pause_file: str, poll_interval: float = 1.0) -> None:
+    """
+    暂停文件存在时阻塞，删除后返回。未暂停时只有一次 exists 检查。
+    装有 inotify_simple 时阻塞等待所在目录的删除/移出事件，删除后立即唤醒；
+    否则（或 inotify 不可用时）按 poll_interval 轮询。
+    """
+    if not os.path.exists(pause_file):
+        return
+    if inotify_simple is not None:
+        try:
+            with inotify_simple.INotify() as watcher:
+                watcher.add_watch(
+                    os.path.dirname(os.path.abspath(pause_file)),
+                    inotify_simple.flags.DELETE | inotify_simple.flags.MOVED_FROM,
+                )
+                while os.path.exists(pause_file):
+                    # 超时仅作兜底（例如事件丢失），正常由删除事件唤醒
+                    watcher.read(timeout=int(poll_interval * 5000))
+            return
+        except OSError:
+            pass  # inotify 实例/监视数耗尽等情况回退轮询
+    while os.path.exists(pause_file):
+        time.sleep(poll_interval)
+
+
+def load_existing_output(output_path: str, keep_content: bool = True) -> tuple:
     """
     加载已有输出文件，用于增量翻译。
     返回 (已翻译行数, 已翻译内容列表, 是否有效)
+    逐行流式读取，不整体读入再 split；keep_content=False 时仅统计行数，内容列表恒为空。
+    输出按时间间隔刷盘，崩溃时末行可能只写了一半：缺少换行符的末行不计入，续翻时会被截掉重译。
     """
     if not os.path.exists(output_path):
         return 0, [], False
     
     try:
+        line_count = 0
+        lines = []
+        has_separator = has_summary = False
         with open(output_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 检查是否包含 summary（完整翻译的标志）
-        if '=' * 20 in content and 'Translation Summary' in content:
+            for line in f:
+                # 检查是否包含 summary（完整翻译的标志）
+                if not has_separator and '=' * 20 in line:
+                    has_separator = True
+                if not has_summary and 'Translation Summary' in line:
+                    has_summary = True
+                if not line.endswith('\n'):
+                    # 未写完的末行
+                    break
+                line_count += 1
+                if keep_content:
+                    # 保留物理行结构（不进行 strip 过滤，也不过滤空行），仅去掉行尾换行符
+                    lines.append(line[:-1])
+        if has_separator and has_summary:
             # 文件已完成，不需要续翻
             return -1, [], False
-        
-        # 分割为行，保留物理行结构（不进行 strip 过滤，也不过滤空行）
-        lines = content.split('\n')
-        # 如果文件以换行符结尾，内容中的最后一个空字符串是 split 产生的噪音，移除它
-        if content.endswith('\n'):
-            lines = lines[:-1]
-            
-        return len(lines), lines, True
+        return line_count, lines, True
     except Exception as e:
         print(f"[Warning] Failed to load existing output: {e}")
         return 0, [], False
 
 
+def _prepare_while_server_starts(engine, prepare: Callable[[], tuple]) -> tuple:
+    """
+    在守护线程中启动服务端（等待模型加载），同时在当前线程执行 prepare()，两者都完成后返回 prepare 的结果。
+    启动异常在当前线程原样抛出。prepare 出错或被 Ctrl+C 中断时不等待模型加载：
+    先置位取消事件（尚未创建的服务端进程不再创建），再停止已创建的进程并抛出（守护线程不会阻塞进程退出）。
+    """
+    start_error = []
+    cancel = threading.Event()
+
+    def _start():
+        try:
+            engine.start_server(cancel=cancel)
+        except BaseException as e:
+            start_error.append(e)
+
+    starter = threading.Thread(target=_start, name="server-start", daemon=True)
+    starter.start()
+    try:
+        result = prepare()
+        # 分段 join，保持主线程对 Ctrl+C 的响应
+        while starter.is_alive():
+            starter.join(0.2)
+    except BaseException:
+        cancel.set()
+        engine.stop_server()
+        raise
+    if start_error:
+        raise start_error[0]
+    return result
+
+
+class _BlockPrefetcher:
+    """
+    块预处理预取：单线程执行器按 queue 顺序提前执行 prepare(block_idx)，未取走的预取至多 depth 个。
+    worker 开始处理某块时先 claim 登记；调度跳过已领取的块，因此同一块不会既被就地处理又被预取，
+    也不会留下无人取走的结果占满窗口。
+    """
+
+    def __init__(self, executor, prepare: Callable[[int], tuple], depth: int, queue: List[int], start: int = 0):
+        self._executor = executor
+        self._prepare = prepare
+        self._depth = depth
+        self._queue = queue
+        self._cursor = min(start, len(queue))
+        self._pending = {}  # block_idx -> Future
+        self._claimed = set()
+        self._lock = threading.Lock()
+
+    def schedule(self) -> None:
+        """补满预取窗口"""
+        with self._lock:
+            while self._cursor < len(self._queue) and len(self._pending) < self._depth:
+                idx = self._queue[self._cursor]
+                self._cursor += 1
+                if idx in self._claimed:
+                    self._claimed.discard(idx)
+                    continue
+                self._pending[idx] = self._executor.submit(self._prepare, idx)
+
+    def claim(self, block_idx: int):
+        """
+        登记 block_idx 已由 worker 接手，返回其已开始（或已完成）的预取 Future；
+        没有预取或预取尚未开始（随即取消）时返回 None，由调用方就地预处理。
+        """
+        with self._lock:
+            self._claimed.add(block_idx)
+            future = self._pending.pop(block_idx, None)
+        if future is not None and future.cancel():
+            return None
+        return future
+
+
+def _source_text_stats(items: List[Dict]) -> tuple:
+    """单次遍历统计非空白条目的 (行数, 字符数)；isspace 判断不分配 strip 副本"""
+    lines = chars = 0
+    for item in items:
+        text = item['text']
+        if text and not text.isspace():
+            lines += 1
+            chars += len(text)
+    return lines, chars
+
+
+def _load_rebuild_cache(cache_path: str) -> tuple:
+    """
+    读取重建模式所需的缓存内容，返回 (sourcePath, outputPath, blocks 可迭代对象)。
+    安装了 ijson 时流式解析 blocks，避免书籍级大缓存整体反序列化；否则回退 json.load。
+    """
+    try:
+        import ijson
+    except ImportError:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+        return cache_data.get('sourcePath'), cache_data.get('outputPath'), cache_data.get('blocks', [])
+
+    # TranslationCache.save 把路径字段写在 blocks 之前，读到两者即可停止扫描
+    header = {}
+    with open(cache_path, 'rb') as f:
+        for prefix, _event, value in ijson.parse(f):
+            if prefix in ('sourcePath', 'outputPath'):
+                header[prefix] = value
+                if len(header) == 2:
+                    break
+
+    def _iter_blocks():
+        with open(cache_path, 'rb') as f:
+            yield from ijson.items(f, 'blocks.item', use_float=True)
+
+    return header.get('sourcePath'), header.get('outputPath'), _iter_blocks()
+
+
+def truncate_existing_output(output_path: str, keep_lines: int) -> None:
+    """
+    原地截断已有输出，只保留前 keep_lines 个完整物理行，供追加模式续写。
+    缺少换行符的末行（崩溃时未写完）一并截掉，保留部分总以换行结尾。
+    """
+    offset = 0
+    with open(output_path, 'rb+') as f:
+        for _ in range(keep_lines):
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+        f.truncate(offset)
+
+
 def get_missed_terms(source_text: str, translated_text: str, glossary: Dict[str, str]) -> List[tuple]:
     """
     获取原文中出现但译文中未正确翻译的术语列表。
@@ -199,6 +467,53 @@ def get_missed_terms(source_text: str, translated_text: str, glossary: Dict[str,
     return missed
 
 
+# 术语表首字符索引（单槽缓存：一次运行只加载一份术语表）
+_glossary_index_slot: tuple = (None, None)
+
+
+def _glossary_first_char_index(glossary: Dict[str, str]) -> Dict[str, List[tuple]]:
+    """按原文术语首字符分桶 {首字符: [(序号, 原文, 译文), ...]}，排除单字术语。"""
+    global _glossary_index_slot
+    cached_glossary, index = _glossary_index_slot
+    if cached_glossary is glossary:
+        return index
+    index = {}
+    for pos, (src_term, dst_term) in enumerate(glossary.items()):
+        if len(src_term) > 1:
+            index.setdefault(src_term[0], []).append((pos, src_term, dst_term))
+    _glossary_index_slot = (glossary, index)
+    return index
+
+
+def _glossary_terms_in(source_text: str, glossary: Dict[str, str]) -> Dict[str, str]:
+    """
+    返回原文中出现的术语子集（排除单字术语），保持术语表原有顺序。
+    仅探测首字符出现在原文中的术语，跳过绝大多数不可能命中的条目。
+    """
+    index = _glossary_first_char_index(glossary)
+    hits = []
+    for ch in set(source_text):
+        bucket = index.get(ch)
+        if bucket:
+            hits.extend(entry for entry in bucket if entry[1] in source_text)
+    hits.sort()
+    return {src_term: dst_term for _, src_term, dst_term in hits}
+
+
+# QualityChecker 构造时会把整张术语表转换为条目列表；同一术语表复用一个实例
+# （check_output 不修改实例状态，可跨线程共享）
+_quality_checker_slot: tuple = (None, None)
+
+
+def _get_quality_checker(glossary) -> QualityChecker:
+    global _quality_checker_slot
+    cached_glossary, qc = _quality_checker_slot
+    if qc is None or cached_glossary is not glossary:
+        qc = QualityChecker(glossary=glossary)
+        _quality_checker_slot = (glossary, qc)
+    return qc
+
+
 def build_retry_feedback(missed_terms: List[tuple], coverage: float) -> str:
     """
     构建重试时注入的反馈文本，用于提醒模型注意漏掉的术语。
@@ -229,7 +544,7 @@ def _parse_protect_pattern_lines(lines: List[str]) -> tuple:
         line = (raw or "").strip()
         if not line:
             continue
-        if line.startswith("#") or line.startswith("//"):
+        if line.startswith(("#", "//")):
             continue
         if line.startswith("!"):
             pat = line[1:].strip()
@@ -247,21 +562,40 @@ def _parse_protect_pattern_payload(raw) -> List[str]:
     if raw is None:
         return []
     if isinstance(raw, list):
-        return [str(p) for p in raw if str(p).strip()]
+        return [p for p in map(str, raw) if p.strip()]
     if isinstance(raw, str):
         stripped = raw.strip()
         if not stripped:
             return []
-        try:
-            parsed = json.loads(stripped)
-            if isinstance(parsed, list):
-                return [str(p) for p in parsed if str(p).strip()]
-        except Exception:
-            pass
+        # 只有以 [ 开头的文本才可能解析为列表，其余直接按行处理，免去必然失败的 json.loads
+        if stripped[0] == "[":
+            try:
+                parsed = json.loads(stripped)
+                if isinstance(parsed, list):
+                    return [p for p in map(str, parsed) if p.strip()]
+            except Exception:
+                pass
         return [line for line in stripped.splitlines() if line.strip()]
     return []
 
 
+def _add_unique_rules(rule_list: List[Dict], patterns, r_type: str = 'format', pos: str = 'append') -> None:
+    """
+    注入尚未存在的内置规则（已有模式集合只统计一次，而非每注入一条就线性扫描一遍）。
+    pos='prepend' 时按给定顺序插入到最前。
+    """
+    existing = {r.get('pattern') for r in rule_list}
+    new_rules = []
+    for pattern in patterns:
+        if pattern not in existing:
+            existing.add(pattern)
+            new_rules.append({"type": r_type, "pattern": pattern, "active": True})
+    if pos == 'prepend':
+        rule_list[:0] = new_rules
+    else:
+        rule_list.extend(new_rules)
+
+
 def _collect_protect_rule_lines(rules: List[Dict]) -> tuple:
     enabled = False
     lines: List[str] = []
@@ -290,51 +624,52 @@ def _collect_legacy_protect_lines(post_rules: List[Dict]) -> List[str]:
 
 def _merge_protect_patterns(base: Optional[List[str]], additions: List[str], removals: List[str]) -> List[str]:
     merged = list(base) if base else []
+    seen = set(merged)  # 成员判断走集合，避免逐个 in 列表的二次方扫描
     for pat in additions:
-        if pat and pat not in merged:
+        if pat and pat not in seen:
             merged.append(pat)
+            seen.add(pat)
     if removals:
-        merged = [p for p in merged if p not in removals]
+        removal_set = set(removals)
+        merged = [p for p in merged if p not in removal_set]
     return merged
 
 
+_SUBTITLE_EXTS = frozenset((".srt", ".ass", ".ssa"))
+# 规则熔断：字幕/对齐模式下会破坏换行或合并行数的格式化规则
+_MELT_PATTERNS = frozenset(('ensure_single_newline', 'ensure_double_newline', 'clean_empty_lines', 'merge_short_lines'))
+
+
+@lru_cache(maxsize=16)
+def _file_ext(path: str) -> str:
+    """小写扩展名（逐块/逐次重试都会查询同一输入路径，结果缓存）"""
+    return os.path.splitext(path)[1].lower()
+
+
 def _allow_text_protect(input_path: Optional[str], args) -> bool:
     if getattr(args, "single_block", None) and not input_path:
         return True
     if getattr(args, "alignment_mode", False):
         if not input_path:
             return True
-        return os.path.splitext(input_path)[1].lower() == ".txt"
+        return _file_ext(input_path) == ".txt"
     if not input_path:
         return False
-    ext = os.path.splitext(input_path)[1].lower()
-    return ext == ".txt"
+    return _file_ext(input_path) == ".txt"
 
 
 def _normalize_anchor_stream(text: str) -> str:
-    """Normalize potentially mangled @id/@end anchors (full-width, spaces, newlines)."""
+    """
+    Normalize potentially mangled @id/@end anchors (full-width, spaces, newlines).
+    The full-width fold applies to the whole text; the result is only used to extract anchor ids.
+    """
     if not text:
         return text
-
-    def _normalize_digits(s: str) -> str:
-        return s.translate(str.maketrans("０１２３４５６７８９", "0123456789"))
-
-    def _fix_id(m: re.Match) -> str:
-        return f"@id={_normalize_digits(m.group(1))}@"
-
-    def _fix_end(m: re.Match) -> str:
-        return f"@end={_normalize_digits(m.group(1))}@"
-
-    text = re.sub(
-        r"[@＠]\s*[iｉIＩ]\s*[dｄDＤ]\s*[=＝]\s*([0-9０-９]+)\s*[@＠]",
-        _fix_id,
-        text,
-    )
-    text = re.sub(
-        r"[@＠]\s*[eｅEＥ]\s*[nｎNＮ]\s*[dｄDＤ]\s*[=＝]\s*([0-9０-９]+)\s*[@＠]",
-        _fix_end,
-        text,
-    )
+    text = text.translate(_ANCHOR_FULLWIDTH)
+    if "@" not in text:
+        return text
+    text = _MANGLED_ID_RE.sub(r"@id=\1@", text)
+    text = _MANGLED_END_RE.sub(r"@end=\1@", text)
     return text
 
 
@@ -346,17 +681,16 @@ def _detect_anchor_missing(original_src_text: str, output_text: str, args) -> tu
     if not getattr(args, "anchor_check", False):
         return False, {}
 
-    file_path = getattr(args, "file", "") or ""
-    ext = os.path.splitext(file_path)[1].lower()
+    ext = _file_ext(getattr(args, "file", "") or "")
 
     # Alignment mode: @id=ID@ ... @id=ID@ (same marker twice)
     if getattr(args, "alignment_mode", False):
         src_norm = _normalize_anchor_stream(original_src_text)
         out_norm = _normalize_anchor_stream(output_text)
-        src_ids = re.findall(r"@id=(\d+)@", src_norm)
+        src_ids = _ANCHOR_ID_RE.findall(src_norm)
         if not src_ids:
             return False, {}
-        out_ids = re.findall(r"@id=(\d+)@", out_norm)
+        out_ids = _ANCHOR_ID_RE.findall(out_norm)
         counts = {}
         for uid in out_ids:
             counts[uid] = counts.get(uid, 0) + 1
@@ -369,11 +703,11 @@ def _detect_anchor_missing(original_src_text: str, output_text: str, args) -> tu
     if ext == ".epub":
         src_norm = _normalize_anchor_stream(original_src_text)
         out_norm = _normalize_anchor_stream(output_text)
-        src_ids = re.findall(r"@id=(\d+)@", src_norm)
+        src_ids = _ANCHOR_ID_RE.findall(src_norm)
         if not src_ids:
             return False, {}
-        out_id_set = set(re.findall(r"@id=(\d+)@", out_norm))
-        out_end_set = set(re.findall(r"@end=(\d+)@", out_norm))
+        out_id_set = set(_ANCHOR_ID_RE.findall(out_norm))
+        out_end_set = set(_ANCHOR_END_RE.findall(out_norm))
         missing = [
             uid for uid in set(src_ids)
             if uid not in out_id_set or uid not in out_end_set
@@ -383,14 +717,11 @@ def _detect_anchor_missing(original_src_text: str, output_text: str, args) -> tu
         return False, {}
 
     # Subtitles (SRT/ASS/SSA): require timecode lines to remain
-    if ext in (".srt", ".ass", ".ssa"):
-        timecode_re = re.compile(
-            r"\d{2}:\d{2}:\d{2}[,\.]\d{1,3}\s*[-=]+>\s*\d{2}:\d{2}:\d{2}[,\.]\d{1,3}"
-        )
-        src_count = len(timecode_re.findall(original_src_text))
+    if ext in _SUBTITLE_EXTS:
+        src_count = len(_TIMECODE_RE.findall(original_src_text))
         if src_count == 0:
             return False, {}
-        dst_count = len(timecode_re.findall(output_text))
+        dst_count = len(_TIMECODE_RE.findall(output_text))
         if dst_count < src_count:
             return True, {"format": "subtitle", "src_count": src_count, "dst_count": dst_count}
 
@@ -432,6 +763,19 @@ def translate_block_with_retry(
     anchor_attempts = 0
     kana_retry_attempts = 0
     kana_retry_budget = 1
+    # 低温采样下模型常原样返回上一轮输出：按 raw_output 记忆解析/术语检查结果，
+    # 重复输出直接复用，并额外加一档温度以尽快跳出重复。
+    attempts_seen: Dict[str, Dict] = {}
+    repeat_boost = 0
+    # 反馈注入目标：最后一条 user 消息（messages 在重试间不变，只定位一次）
+    user_turn_idx = next(
+        (j for j in range(len(messages) - 1, -1, -1) if messages[j].get("role") == "user"),
+        None,
+    )
+    # 原文非空行数在重试间不变，行数校验前只统计一次
+    src_line_count = sum(1 for l in original_src_text.splitlines() if l.strip())
+    # 原文在重试间不变：原文中出现的术语子集只需扫描整表一次，各轮仅检查该子集
+    block_glossary = None
     anchor_retry_budget = 0
     if getattr(args, "anchor_check", False):
         try:
@@ -457,7 +801,7 @@ def translate_block_with_retry(
         current_rep_base = args.rep_penalty_base
         
         if retry_reason in ('line_check', 'strict_line_check', 'anchor_missing', 'kana_residue'):
-            retry_steps = max(1, global_attempts + anchor_attempts + kana_retry_attempts)
+            retry_steps = max(1, global_attempts + anchor_attempts + kana_retry_attempts + repeat_boost)
             current_temp = min(args.temperature + (retry_steps * args.retry_temp_boost), 1.2)
         elif retry_reason == 'glossary':
             current_temp = max(args.temperature - (glossary_attempts * args.retry_temp_boost), 0.3)
@@ -465,40 +809,72 @@ def translate_block_with_retry(
         messages_for_attempt = messages
         if attempt > 0 and args.retry_prompt_feedback and glossary and last_missed_terms and retry_reason == 'glossary':
             feedback = build_retry_feedback(last_missed_terms, last_coverage)
-            if feedback:
+            if feedback and user_turn_idx is not None:
                 messages_for_attempt = messages.copy()
-                for j in range(len(messages_for_attempt) - 1, -1, -1):
-                    if messages_for_attempt[j].get("role") == "user":
-                        messages_for_attempt[j] = {
-                            "role": "user",
-                            "content": messages_for_attempt[j]["content"] + feedback
-                        }
-                        break
+                messages_for_attempt[user_turn_idx] = {
+                    "role": "user",
+                    "content": messages[user_turn_idx]["content"] + feedback
+                }
         
-        accumulated_output = ""
+        # 流式输出只用于判断是否处于 <think> 段内，增量维护状态即可，
+        # 无需反复拼接整段输出（长输出下 += 会退化为 O(N²)）
+        think_head = ""      # 去除前导空白后的前 7 个字符
+        think_tail = ""      # 已接收内容的末尾，用于识别跨片段的 </think>
+        think_closed = False
+        # 思考增量按时间窗合并后再写出：流式片段通常只有几个字符，逐片加锁 + flush 会让各 worker 频繁争用 stdout
+        think_pending = []
+        think_last_emit = time.monotonic()
+
+        def flush_think_delta():
+            nonlocal think_last_emit
+            think_last_emit = time.monotonic()
+            if not think_pending:
+                return
+            try:
+                # 序列化在锁外完成，锁内仅做写出与 flush，缩短各工作线程争用 stdout 的时间
+                line = f"\nJSON_THINK_DELTA:{_json_str(''.join(think_pending))}\n"
+                think_pending.clear()
+                with stdout_lock:
+                    sys.stdout.write(line)
+                    sys.stdout.flush()
+            except: pass
+
         def on_stream_chunk(chunk):
-            nonlocal accumulated_output
-            accumulated_output += chunk
-            if "<think>" in chunk or "</think>" in chunk or (accumulated_output.strip().startswith("<think>") and not "</think>" in accumulated_output):
-                try:
-                    with stdout_lock:
-                        sys.stdout.write(f"\nJSON_THINK_DELTA:{json.dumps(chunk, ensure_ascii=False)}\n")
-                        sys.stdout.flush()
-                except: pass
-
-        full_response_text, block_usage = engine.chat_completion(
-            messages=messages_for_attempt,
-            temperature=current_temp,
-            stream=True,
-            stream_callback=on_stream_chunk,
-            rep_base=current_rep_base,
-            rep_max=args.rep_penalty_max,
-            rep_step=args.rep_penalty_step,
-            block_id=block_idx + 1
-        )
+            nonlocal think_head, think_tail, think_closed
+            if len(think_head) < 7:
+                think_head = (think_head + chunk).lstrip()[:7]
+            if not think_closed:
+                window = think_tail + chunk
+                think_closed = "</think>" in window
+                think_tail = window[-7:]
+            if "<think>" in chunk or "</think>" in chunk or (think_head == "<think>" and not think_closed):
+                think_pending.append(chunk)
+                if time.monotonic() - think_last_emit >= THINK_DELTA_FLUSH_SECS:
+                    flush_think_delta()
+
+        try:
+            full_response_text, block_usage = engine.chat_completion(
+                messages=messages_for_attempt,
+                temperature=current_temp,
+                stream=True,
+                stream_callback=on_stream_chunk,
+                rep_base=current_rep_base,
+                rep_max=args.rep_penalty_max,
+                rep_step=args.rep_penalty_step,
+                block_id=block_idx + 1
+            )
+        finally:
+            flush_think_delta()
         
         raw_output = full_response_text
-        parsed_lines, cot_content = response_parser.parse(raw_output or "", expected_count=0)
+        seen = attempts_seen.get(raw_output or "")
+        if seen is None:
+            parsed_lines, cot_content = response_parser.parse(raw_output or "", expected_count=0)
+            seen = attempts_seen[raw_output or ""] = {"parsed": (parsed_lines, cot_content)}
+        else:
+            # 只有失败的输出才会进入下一轮，重复即意味着重复失败
+            parsed_lines, cot_content = seen["parsed"]
+            repeat_boost += 1
         has_content = parsed_lines and any(line.strip() for line in parsed_lines)
 
         if not has_content:
@@ -511,7 +887,6 @@ def translate_block_with_retry(
                 continue
             else: break
 
-        src_line_count = len([l for l in original_src_text.splitlines() if l.strip()])
         dst_line_count = len([l for l in parsed_lines if l.strip()])
         diff = abs(dst_line_count - src_line_count)
         pct_diff = diff / max(1, src_line_count)
@@ -591,13 +966,20 @@ def translate_block_with_retry(
                     continue
 
         if glossary and args.output_hit_threshold > 0 and not structural_retry_happened:
-            translated_text = '\n'.join(parsed_lines)
-            passed, coverage, cot_coverage, hit, total = calculate_glossary_coverage(
-                original_src_text, translated_text, glossary, cot_content,
-                args.output_hit_threshold, args.cot_coverage_threshold
-            )
+            if "glossary" not in seen:
+                if block_glossary is None:
+                    # 子集为空时回退整表，保留覆盖率检查的"无相关术语"日志
+                    block_glossary = _glossary_terms_in(original_src_text, glossary) or glossary
+                translated_text = '\n'.join(parsed_lines)
+                seen["glossary"] = (
+                    calculate_glossary_coverage(
+                        original_src_text, translated_text, block_glossary, cot_content,
+                        args.output_hit_threshold, args.cot_coverage_threshold
+                    ),
+                    get_missed_terms(original_src_text, translated_text, block_glossary),
+                )
+            (passed, coverage, cot_coverage, hit, total), last_missed_terms = seen["glossary"]
             last_coverage = coverage
-            last_missed_terms = get_missed_terms(original_src_text, translated_text, glossary)
             
             if best_result is None or coverage > best_result[3]:
                 best_result = (parsed_lines.copy(), cot_content, raw_output, coverage, block_usage)
@@ -635,13 +1017,16 @@ def translate_block_with_retry(
     base_text = '\n'.join(final_output["parsed_lines"])
     processed_text = post_processor.process(base_text, src_text=original_src_text, protector=protector, strict_line_count=strict_mode)
     
+    # 非空译文行只切分一次，质量检查与行数统计共用
+    out_nonblank_lines = [l for l in processed_text.split('\n') if l.strip()]
+
     warnings = []
     try:
-        qc = QualityChecker(glossary=glossary)
+        qc = _get_quality_checker(glossary)
         qc_source_lang = "ja"
         warnings = qc.check_output(
             [l for l in original_src_text.split('\n') if l.strip()], 
-            [l for l in processed_text.split('\n') if l.strip()], 
+            out_nonblank_lines, 
             source_lang=qc_source_lang
         )
     except Exception as e:
@@ -656,7 +1041,7 @@ def translate_block_with_retry(
         "cot": final_output["cot"],
         "raw_output": final_output["raw"],
         "warnings": warnings,
-        "lines_count": len([l for l in processed_text.splitlines() if l.strip()]),
+        "lines_count": len(out_nonblank_lines),
         "chars_count": len(original_src_text),
         "cot_chars": len(final_output["cot"]),
         "usage": final_output["usage"],
@@ -665,10 +1050,12 @@ def translate_block_with_retry(
     }
 
 
-def calculate_skip_blocks(blocks, existing_lines: int, is_chunk_mode: bool = False) -> int:
+def calculate_skip_blocks(blocks, existing_lines: int, is_chunk_mode: bool = False,
+                          line_counts: Optional[List[int]] = None) -> int:
     """
     根据已翻译行数计算应该跳过的块数。
     采用保守策略：只跳过完全匹配的块。
+    line_counts: 可选的逐块源文本行数（调用方已统计时传入，避免重复扫描）
     """
     if existing_lines <= 0:
         return 0
@@ -676,7 +1063,7 @@ def calculate_skip_blocks(blocks, existing_lines: int, is_chunk_mode: bool = Fal
     cumulative_lines = 0
     for i, block in enumerate(blocks):
         # 估算这个块的应有输出行数（与输入行数相同）
-        block_lines = block.prompt_text.count('\n') + 1
+        block_lines = line_counts[i] if line_counts is not None else block.prompt_text.count('\n') + 1
         
         # 分块模式下，每个块输出后会多加一个空行
         physical_lines = block_lines + 1 if is_chunk_mode else block_lines
@@ -690,15 +1077,113 @@ def calculate_skip_blocks(blocks, existing_lines: int, is_chunk_mode: bool = Fal
     return len(blocks)
 
 
+def _config_fingerprint(config_payload: Dict) -> str:
+    """
+    生成续翻配置指纹：按键排序逐字段喂入 blake2b，无需先序列化整份 JSON。
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for key in sorted(config_payload):
+        h.update(key.encode("utf-8"))
+        h.update(b"\x00")
+        h.update(repr(config_payload[key]).encode("utf-8"))
+        h.update(b"\x01")
+    return h.hexdigest()
+
+
+def _legacy_config_fingerprint(config_payload: Dict) -> str:
+    """旧版 SHA-256 指纹，仅用于匹配升级前写入的续翻临时文件"""
+    return hashlib.sha256(json.dumps(config_payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _query_nvidia_smi(field: str) -> Optional[str]:
+    """通过 nvidia-smi 查询单个 GPU 字段（支持 Windows 多路径），失败返回 None"""
+    # Windows 上 nvidia-smi 可能不在 PATH 中
+    nvidia_smi_paths = ['nvidia-smi']
+    if sys.platform == 'win32':
+        nvidia_smi_paths.extend([
+            r'C:\Windows\System32\nvidia-smi.exe',
+            r'C:\Program Files\NVIDIA Corporation\NVSMI\nvidia-smi.exe'
+        ])
+
+    for nvidia_smi in nvidia_smi_paths:
+        try:
+            # 检查命令是否存在
+            if not os.path.isabs(nvidia_smi) and not shutil.which(nvidia_smi):
+                continue
+            if os.path.isabs(nvidia_smi) and not os.path.exists(nvidia_smi):
+                continue
+
+            result = subprocess.run(
+                [nvidia_smi, f'--query-gpu={field}', '--format=csv,noheader'],
+                capture_output=True, text=True, timeout=5
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+        except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+            continue
+    return None
+
+
+@lru_cache(maxsize=1)
+def has_nvidia_gpu() -> bool:
+    """跨平台检测 NVIDIA GPU（支持 Windows 多路径）。
+
+    结果进程内缓存；设置 MURASAKI_FORCE_BACKEND=cuda|vulkan|metal 可跳过 nvidia-smi 探测。
+    """
+    forced_backend = os.environ.get("MURASAKI_FORCE_BACKEND", "").strip().lower()
+    if forced_backend:
+        logger.info(f"Backend forced by MURASAKI_FORCE_BACKEND: {forced_backend}")
+        return forced_backend == "cuda"
+
+    gpu_names = _query_nvidia_smi("name")
+    if gpu_names:
+        logger.info(f"NVIDIA GPU detected: {gpu_names}")
+        return True
+
+    logger.info("No NVIDIA GPU detected, using Vulkan/Metal fallback")
+    return False
+
+
+@lru_cache(maxsize=1)
+def nvidia_compute_capability() -> Optional[float]:
+    """返回 NVIDIA GPU 的最低 compute capability（多卡取最小值），无 NVIDIA GPU 时返回 None"""
+    if not has_nvidia_gpu():
+        return None
+    raw = _query_nvidia_smi("compute_cap")
+    if not raw:
+        return None
+    caps = []
+    for line in raw.splitlines():
+        try:
+            caps.append(float(line.strip()))
+        except ValueError:
+            continue
+    return min(caps) if caps else None
+
+
+@lru_cache(maxsize=1)
+def nvidia_total_vram_mb() -> Optional[int]:
+    """返回 NVIDIA GPU 的最小显存总量 (MiB)，无 NVIDIA GPU 时返回 None"""
+    if not has_nvidia_gpu():
+        return None
+    raw = _query_nvidia_smi("memory.total")
+    if not raw:
+        return None
+    sizes = []
+    for line in raw.splitlines():
+        parts = line.split()
+        if parts and parts[0].isdigit():
+            sizes.append(int(parts[0]))
+    return min(sizes) if sizes else None
+
+
+@lru_cache(maxsize=1)
 def get_gpu_name():
-    """跨平台获取 GPU 名称"""
-    import sys as _sys
-    
+    """跨平台获取 GPU 名称（进程内不变，结果缓存，子进程探测只执行一次）"""
     try:
-        if _sys.platform == 'darwin':
+        if sys.platform == 'darwin':
             # macOS: 使用 system_profiler
             try:
-                import json as _json
                 result = subprocess.run(
                     ['system_profiler', 'SPDisplaysDataType', '-json'],
                     capture_output=True,
@@ -706,7 +1191,7 @@ def get_gpu_name():
                     timeout=10
                 )
                 if result.returncode == 0:
-                    data = _json.loads(result.stdout)
+                    data = json.loads(result.stdout)
                     displays = data.get('SPDisplaysDataType', [])
                     for display in displays:
                         name = display.get('sppci_model', '')
@@ -716,13 +1201,13 @@ def get_gpu_name():
                 pass
             return "Apple GPU (Metal)"
         
-        elif _sys.platform == 'win32':
+        elif sys.platform == 'win32':
             # Windows: 优先 nvidia-smi，回退 wmic
             try:
                 result = subprocess.check_output(
-                    "nvidia-smi -L", 
-                    shell=True, 
-                    stderr=subprocess.STDOUT
+                    ['nvidia-smi', '-L'],
+                    stderr=subprocess.STDOUT,
+                    timeout=5
                 ).decode('gb18030', errors='ignore')
                 
                 names = []
@@ -787,6 +1272,7 @@ def get_gpu_name():
     except Exception as e:
         return f"Unknown / CPU (Error: {str(e)})"
 
+@lru_cache(maxsize=32)
 def format_model_info(model_path: str):
     filename = os.path.basename(model_path)
     
@@ -812,15 +1298,13 @@ def format_model_info(model_path: str):
     return display_name, params, quant
 
 
-def translate_single_block(args):
+def _get_single_block_engine(args) -> InferenceEngine:
     """
-    单块翻译模式 - 用于校对界面的重翻功能
-    直接翻译 args.single_block 中的文本，支持文本保护，输出 JSON 格式结果
+    获取已启动的单块重翻引擎。启动参数不变时复用已加载模型的 llama-server（--daemon 下跨请求常驻），
+    参数变化时先关闭旧实例；进程退出时由 start_server 注册的 atexit 回收。
+    客户端模式 (--no-server-spawn) 启停均为空操作，不做缓存。
     """
-    middleware_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Initialize Engine
-    engine = InferenceEngine(
+    engine_kwargs = dict(
         server_path=args.server,
         model_path=args.model,
         n_gpu_layers=args.gpu_layers,
@@ -832,46 +1316,122 @@ def translate_single_block(args):
         batch_size=getattr(args, 'batch_size', None),
         seed=getattr(args, 'seed', None)
     )
-    
-    # Load Glossary
-    glossary = load_glossary(args.glossary)
-    
+    if engine_kwargs["no_spawn"]:
+        engine = InferenceEngine(**engine_kwargs)
+        engine.start_server()
+        return engine
+
+    key = tuple(engine_kwargs.items())
+    with _ENGINE_CACHE_LOCK:
+        engine = _ENGINE_CACHE.get(key)
+        if engine is not None and engine.process is not None and engine.process.poll() is None:
+            return engine
+        for stale_engine in _ENGINE_CACHE.values():
+            stale_engine.stop_server()
+        _ENGINE_CACHE.clear()
+
+        engine = InferenceEngine(**engine_kwargs)
+        try:
+            engine.start_server()
+        except BaseException:
+            engine.stop_server()
+            raise
+        _ENGINE_CACHE[key] = engine
+        return engine
+
+
+@dataclass(frozen=True)
+class _SingleBlockConfig:
+    """单块重翻的派生配置（规则处理器、保护模式、严格对齐策略）"""
+    notices: tuple
+    text_protect: bool
+    custom_protector_patterns: Optional[List[str]]
+    pre_processor: RuleProcessor
+    post_processor: RuleProcessor
+    strict_policy: str
+    enforce_strict_alignment: bool
+    is_sub: bool
+
+
+def _path_mtime(path: Optional[str]) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def _get_single_block_config(args) -> _SingleBlockConfig:
+    """按参数与规则/保护文件的 mtime 取派生配置，文件被修改后自动失效"""
+    rules_pre = getattr(args, 'rules_pre', None)
+    rules_post = getattr(args, 'rules_post', None)
+    protect_patterns = getattr(args, 'protect_patterns', None)
+    return _derive_single_block_config(
+        getattr(args, 'file', '') or "",
+        rules_pre,
+        rules_post,
+        protect_patterns,
+        bool(getattr(args, 'alignment_mode', False)),
+        bool(getattr(args, 'text_protect', False)),
+        bool(getattr(args, 'single_block', None)),
+        getattr(args, 'strict_mode', 'subs'),
+        (_path_mtime(rules_pre), _path_mtime(rules_post), _path_mtime(protect_patterns)),
+    )
+
+
+@lru_cache(maxsize=16)
+def _derive_single_block_config(input_path: str, rules_pre: Optional[str], rules_post: Optional[str],
+                                protect_patterns: Optional[str], alignment_mode: bool, text_protect: bool,
+                                single_block: bool, strict_policy: str, file_mtimes: tuple) -> _SingleBlockConfig:
+    # file_mtimes 仅参与缓存键
+    notices: List[str] = []
+
     # Load Rules (Optional)
-    pre_rules = load_rules(args.rules_pre) if hasattr(args, 'rules_pre') and args.rules_pre else []
-    post_rules = load_rules(args.rules_post) if hasattr(args, 'rules_post') and args.rules_post else []
+    pre_rules = load_rules(rules_pre) if rules_pre else []
+    post_rules = load_rules(rules_post) if rules_post else []
 
     protect_rule_enabled, protect_rule_lines = _collect_protect_rule_lines(pre_rules)
     legacy_protect_lines = _collect_legacy_protect_lines(post_rules)
-    input_path = getattr(args, 'file', '') or ""
-    text_protect_allowed = _allow_text_protect(input_path, args)
+    # 扩展名只解析一次，后续格式判断均基于它
+    file_ext = _file_ext(input_path)
+    is_sub_ext = file_ext in _SUBTITLE_EXTS
+    text_protect_allowed = _allow_text_protect(
+        input_path, argparse.Namespace(single_block=single_block, alignment_mode=alignment_mode)
+    )
     if text_protect_allowed:
-        if protect_rule_enabled and not args.text_protect:
-            print("[Auto-Config] Pre-rules text protection enabled.")
-            args.text_protect = True
-        if legacy_protect_lines and not args.text_protect:
-            print("[Auto-Config] Legacy protection rule detected. Enabling TextProtector.")
-            args.text_protect = True
-        if args.protect_patterns and not args.text_protect:
-            print("[Auto-Config] protect_patterns provided. Enabling TextProtector.")
-            args.text_protect = True
+        if protect_rule_enabled and not text_protect:
+            notices.append("[Auto-Config] Pre-rules text protection enabled.")
+            text_protect = True
+        if legacy_protect_lines and not text_protect:
+            notices.append("[Auto-Config] Legacy protection rule detected. Enabling TextProtector.")
+            text_protect = True
+        if protect_patterns and not text_protect:
+            notices.append("[Auto-Config] protect_patterns provided. Enabling TextProtector.")
+            text_protect = True
     else:
-        if args.text_protect or protect_rule_enabled or legacy_protect_lines or args.protect_patterns:
-            print("[TextProtect] Disabled for non-txt input.")
-        args.text_protect = False
+        if text_protect or protect_rule_enabled or legacy_protect_lines or protect_patterns:
+            notices.append("[TextProtect] Disabled for non-txt input.")
+        text_protect = False
         protect_rule_lines = []
         legacy_protect_lines = []
 
-    post_rules = [r for r in post_rules if r.get('pattern') != 'restore_protection']
-    if text_protect_allowed and args.text_protect:
+    # 针对 SRT/ASS 的特殊工程化处理 (Rule Melting)：与 restore_protection 去重合并为一次遍历
+    is_sub = is_sub_ext
+    if is_sub:
+        pre_rules = [r for r in pre_rules if r.get('pattern') not in _MELT_PATTERNS]
+    post_rules = [
+        r for r in post_rules
+        if r.get('pattern') != 'restore_protection' and not (is_sub and r.get('pattern') in _MELT_PATTERNS)
+    ]
+    if text_protect_allowed and text_protect:
         post_rules.append({"type": "format", "pattern": "restore_protection", "active": True})
 
     custom_protector_patterns = None
     if text_protect_allowed:
-        if getattr(args, 'file', '').lower().endswith(('.srt', '.ass', '.ssa')):
+        if is_sub_ext:
             custom_protector_patterns = TextProtector.SUBTITLE_PATTERNS
-        elif getattr(args, 'file', '').lower().endswith('.epub'):
+        elif file_ext == '.epub':
             custom_protector_patterns = [r'@id=\d+@', r'@end=\d+@', r'<[^>]+>']
-        elif args.alignment_mode:
+        elif alignment_mode:
             anchor_patterns = [r'@id=\d+@', r'@end=\d+@']
             custom_protector_patterns = _merge_protect_patterns(
                 TextProtector.DEFAULT_PATTERNS,
@@ -889,17 +1449,17 @@ def translate_single_block(args):
             add, rem = _parse_protect_pattern_lines(legacy_protect_lines)
             additions.extend(add)
             removals.extend(rem)
-        if args.protect_patterns and os.path.exists(args.protect_patterns):
+        if protect_patterns and os.path.exists(protect_patterns):
             try:
                 raw_text = ""
-                with open(args.protect_patterns, 'r', encoding='utf-8') as f:
+                with open(protect_patterns, 'r', encoding='utf-8') as f:
                     raw_text = f.read()
                 file_lines = _parse_protect_pattern_payload(raw_text)
                 add, rem = _parse_protect_pattern_lines(file_lines)
                 additions.extend(add)
                 removals.extend(rem)
             except Exception as e:
-                print(f"[Warning] Failed to load protection patterns: {e}")
+                notices.append(f"[Warning] Failed to load protection patterns: {e}")
 
         if additions or removals:
             base_patterns = (
@@ -911,40 +1471,62 @@ def translate_single_block(args):
 
     pre_processor = RuleProcessor(pre_rules)
     post_processor = RuleProcessor(post_rules)
-    prompt_builder = PromptBuilder(glossary)
-    parser = ResponseParser()
-    
-    # Initialize Text Protector
-    protector = None
-    if text_protect_allowed and getattr(args, 'text_protect', False):
-         protector = TextProtector(patterns=custom_protector_patterns)
-    
-    
-    # 针对 SRT/ASS 的特殊工程化处理 (Rule Melting)
-    is_sub = getattr(args, 'file', '').lower().endswith(('.srt', '.ass', '.ssa')) if args.file else False
-    
+
     # Strict mode logic for retranslate:
     # - all: Force strict line count
     # - subs: Force for subtitles and epub (epub usually isn't retranslated this way but for completeness)
     # - off: Disable
-    strict_policy = getattr(args, 'strict_mode', 'subs')
     enforce_strict_alignment = False
     if strict_policy == "all":
         enforce_strict_alignment = True
     elif strict_policy == "subs":
         # Check by file extension
-        ext = os.path.splitext(args.file)[1].lower() if args.file else ""
-        enforce_strict_alignment = ext in ['.srt', '.ass', '.ssa', '.epub']
-        
-    if is_sub:
-        # Rule melting for retranslate
-        melt_patterns = ['ensure_single_newline', 'ensure_double_newline', 'clean_empty_lines', 'merge_short_lines']
-        pre_processor.rules = [r for r in pre_rules if r.get('pattern') not in melt_patterns]
-        post_processor.rules = [r for r in post_rules if r.get('pattern') not in melt_patterns]
-        logger.info(f"[Retranslate] Subtitle detected. Rule melting applied (Strict Policy: {strict_policy}).")
+        enforce_strict_alignment = is_sub_ext or file_ext == '.epub'
+
+    return _SingleBlockConfig(
+        notices=tuple(notices),
+        text_protect=text_protect_allowed and text_protect,
+        custom_protector_patterns=custom_protector_patterns,
+        pre_processor=pre_processor,
+        post_processor=post_processor,
+        strict_policy=strict_policy,
+        enforce_strict_alignment=enforce_strict_alignment,
+        is_sub=is_sub,
+    )
+
+
+def translate_single_block(args):
+    """
+    单块翻译模式 - 用于校对界面的重翻功能
+    直接翻译 args.single_block 中的文本，支持文本保护，输出 JSON 格式结果
+    """
+    middleware_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    # Load Glossary
+    glossary = load_glossary(args.glossary)
+    
+    # Rules / 文本保护 / 严格模式等派生配置（--daemon 下按参数与规则文件 mtime 复用）
+    config = _get_single_block_config(args)
+    for notice in config.notices:
+        print(notice)
+    args.text_protect = config.text_protect
+    pre_processor = config.pre_processor
+    post_processor = config.post_processor
+    enforce_strict_alignment = config.enforce_strict_alignment
+    prompt_builder = PromptBuilder(glossary)
+    parser = ResponseParser()
+    
+    # Initialize Text Protector（占位符映射为逐次状态，每次新建）
+    protector = None
+    if config.text_protect:
+         protector = TextProtector(patterns=config.custom_protector_patterns)
+    
+    if config.is_sub:
+        logger.info(f"[Retranslate] Subtitle detected. Rule melting applied (Strict Policy: {config.strict_policy}).")
 
     try:
-        engine.start_server()
+        # Initialize Engine（按启动参数复用已启动的 server）
+        engine = _get_single_block_engine(args)
         
         # 1. Input Validation
         src_text = args.single_block
@@ -978,7 +1560,7 @@ def translate_single_block(args):
             response_parser=parser,
             post_processor=post_processor,
             glossary=glossary,
-            stdout_lock=threading.Lock(), # Local lock for single block
+            stdout_lock=nullcontext(), # Single block: no other threads to serialize against
             strict_mode=enforce_strict_alignment,
             protector=protector
         )
@@ -1003,21 +1585,73 @@ def translate_single_block(args):
         
         # Output
         if args.json_output:
-            print(f"JSON_RESULT:{json.dumps(result, ensure_ascii=False)}")
+            print(f"JSON_RESULT:{_dumps_json_line(result)}")
         else:
             print(result.get('dst', ''))
             
     except Exception as e:
         if args.json_output:
-            print(f"JSON_RESULT:{json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False)}")
+            print(f"JSON_RESULT:{_dumps_json_line({'success': False, 'error': str(e)})}")
         else:
             print(f"Error: {e}")
-    finally:
-        engine.stop_server()
+
+
+def _daemon_request_overrides(request: dict, base: dict, parser: Optional[argparse.ArgumentParser] = None) -> dict:
+    """
+    校验并转换常驻模式的单条请求：键名须为已知参数（single-block 写法归一为 single_block），
+    字符串值按 parser 中对应参数的 type 转换，并检查 choices；单值参数不接受列表/对象。
+    不合法时抛出 ValueError。
+    """
+    actions = {action.dest: action for action in parser._actions} if parser is not None else {}
+    overrides = {}
+    for key, value in request.items():
+        dest = str(key).replace('-', '_')
+        if dest not in base:
+            raise ValueError(f"unknown option: {key}")
+        action = actions.get(dest)
+        if action is not None:
+            if isinstance(value, (list, dict)) and action.nargs is None:
+                raise ValueError(f"option {key} expects a single value")
+            if isinstance(value, str) and action.type is not None:
+                try:
+                    value = action.type(value)
+                except (TypeError, ValueError, argparse.ArgumentTypeError) as e:
+                    raise ValueError(f"invalid value for {key}: {value!r} ({e})")
+            if action.choices is not None and value is not None and value not in action.choices:
+                raise ValueError(f"invalid choice for {key}: {value!r}")
+        overrides[dest] = value
+    return overrides
+
+
+def run_single_block_daemon(base_args, parser: Optional[argparse.ArgumentParser] = None) -> None:
+    """
+    单块重翻常驻模式：从 stdin 逐行读取 JSON 请求，每行执行一次 translate_single_block。
+    请求键名同命令行参数（single_block / file / glossary ...，也接受 single-block 写法），
+    未提供的参数沿用启动参数；省去每次重翻的解释器启动、模块导入与参数解析。
+    单条请求出错时输出失败的 JSON_RESULT 并继续处理下一条，不退出常驻循环。
+    """
+    base = {**vars(base_args), "json_output": True}
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            overrides = _daemon_request_overrides(request, base, parser)
+        except ValueError as e:
+            print(f"JSON_RESULT:{_dumps_json_line({'success': False, 'error': f'Invalid request: {e}'})}")
+            sys.stdout.flush()
+            continue
+        try:
+            translate_single_block(argparse.Namespace(**{**base, **overrides}))
+        except Exception as e:
+            print(f"JSON_RESULT:{_dumps_json_line({'success': False, 'error': str(e)})}")
+        sys.stdout.flush()
 
 
 def main():
-    import logging
     logging.basicConfig(
         level=logging.INFO,
         format='[%(asctime)s] [%(levelname)s] %(message)s',
@@ -1033,42 +1667,8 @@ def main():
     # 跨平台 llama-server 路径检测
     def get_llama_server_path(mdir: str) -> str:
         """根据平台自动选择正确的 llama-server 二进制"""
-        import platform as plt
-        import subprocess
         system = sys.platform
-        machine = plt.machine().lower()
-        
-        # 跨平台检测 NVIDIA GPU（支持 Windows 多路径）
-        def has_nvidia_gpu() -> bool:
-            import shutil
-            # Windows 上 nvidia-smi 可能不在 PATH 中
-            nvidia_smi_paths = ['nvidia-smi']
-            if system == 'win32':
-                nvidia_smi_paths.extend([
-                    r'C:\Windows\System32\nvidia-smi.exe',
-                    r'C:\Program Files\NVIDIA Corporation\NVSMI\nvidia-smi.exe'
-                ])
-            
-            for nvidia_smi in nvidia_smi_paths:
-                try:
-                    # 检查命令是否存在
-                    if not os.path.isabs(nvidia_smi) and not shutil.which(nvidia_smi):
-                        continue
-                    if os.path.isabs(nvidia_smi) and not os.path.exists(nvidia_smi):
-                        continue
-                    
-                    result = subprocess.run(
-                        [nvidia_smi, '--query-gpu=name', '--format=csv,noheader'],
-                        capture_output=True, text=True, timeout=5
-                    )
-                    if result.returncode == 0 and result.stdout.strip():
-                        logger.info(f"NVIDIA GPU detected: {result.stdout.strip()}")
-                        return True
-                except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
-                    continue
-            
-            logger.info("No NVIDIA GPU detected, using Vulkan/Metal fallback")
-            return False
+        machine = platform.machine().lower()
         
         # 平台映射表
         if system == 'win32':
@@ -1196,15 +1796,18 @@ def main():
     parser.add_argument("--force-translation", action="store_true", help="Force re-translation (ignore existing cache)")
     parser.add_argument("--single-block", help="Translate a single block (for proofreading retranslate)")
     parser.add_argument("--json-output", action="store_true", help="Output result as JSON (for single-block mode)")
+    parser.add_argument("--daemon", action="store_true", help="Single-block daemon: read retranslate requests as JSON lines from stdin")
+    parser.add_argument("--no-preview", action="store_true", help="Skip JSON_PREVIEW_BLOCK events (no frontend attached)")
     parser.add_argument("--rebuild-from-cache", help="Rebuild document from specified cache JSON file")
     parser.add_argument("--no-server-spawn", action="store_true", help="Client mode: connect to existing server")
     parser.add_argument("--server-host", default="127.0.0.1", help="External server host (default: 127.0.0.1)")
     parser.add_argument("--server-port", type=int, default=8080, help="External server port (default: 8080)")
     
     parser.add_argument("--concurrency", type=int, default=1, help="Parallel slots count (default 1)")
+    parser.add_argument("--prefetch-depth", type=int, default=0, help="Pre-process up to N upcoming blocks in a background thread while the engine is busy (default 0 = off)")
     # High-Fidelity Granular Settings
     parser.add_argument("--high-fidelity", action="store_true", help="Master Switch: Enable recommended High-Fidelity settings")
-    parser.add_argument("--flash-attn", action="store_true", help="Enable Flash Attention")
+    parser.add_argument("--flash-attn", action=argparse.BooleanOptionalAction, default=False, help="Enable Flash Attention (--no-flash-attn disables it, e.g. under MURASAKI_AUTO_FA)")
     parser.add_argument("--kv-cache-type", default="f16", choices=["f16", "q8_0", "q5_1", "q4_0"], help="KV Cache Quantization (default: f16)")
     parser.add_argument("--use-large-batch", action="store_true", help="Use large batch sizes (b=ub=1024 for safety)")
     parser.add_argument("--batch-size", type=int, help="Manual physical batch size (overrides large-batch default)")
@@ -1215,6 +1818,16 @@ def main():
     parser.add_argument("--balance-threshold", type=float, default=0.6, help="Tail balance threshold (default 0.6)")
     parser.add_argument("--balance-count", type=int, default=3, help="Tail balance range count (default 3)")
     
+    # [Opt-in] Ampere+ (compute capability >= 8.0) 默认开启 Flash Attention + q8_0 KV Cache
+    if os.environ.get("MURASAKI_AUTO_FA", "0").strip().lower() in {"1", "true", "yes", "on"}:
+        compute_cap = nvidia_compute_capability()
+        if compute_cap is not None and compute_cap >= 8.0:
+            parser.set_defaults(flash_attn=True, kv_cache_type="q8_0")
+            logger.info(
+                f"MURASAKI_AUTO_FA: compute capability {compute_cap} detected, "
+                "defaulting to --flash-attn --kv-cache-type q8_0 (pass --no-flash-attn / --kv-cache-type to override, or unset MURASAKI_AUTO_FA)."
+            )
+
     args = parser.parse_args()
 
     raw_mode = str(getattr(args, "mode", "") or "").strip().lower()
@@ -1227,7 +1840,7 @@ def main():
         args.mode = "chunk"
 
     # Manual validation for --file
-    if not args.single_block and not args.rebuild_from_cache and not args.file:
+    if not args.single_block and not args.daemon and not args.rebuild_from_cache and not args.file:
         parser.error("the following arguments are required: --file")
     
     # High-Fidelity Logic is now handled by the frontend.
@@ -1244,39 +1857,43 @@ def main():
                 print(f"[Error] Cache file not found: {args.rebuild_from_cache}")
                 return
             
-            with open(args.rebuild_from_cache, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+            source_path, cached_output_path, cached_blocks = _load_rebuild_cache(args.rebuild_from_cache)
+            output_path = args.output or cached_output_path
+            # 路径判定只做一次，后续分支复用
+            has_source = bool(source_path) and os.path.exists(source_path)
+            output_is_txt = bool(output_path) and output_path.lower().endswith('.txt')
             
-            source_path = cache_data.get('sourcePath')
-            output_path = args.output or cache_data.get('outputPath')
-            
-            if not source_path or not os.path.exists(source_path):
+            if not has_source:
                 print(f"[Error] Source file not found or not recorded in cache: {source_path}")
                 # Fallback: if output_path is txt, we can still rebuild it without source
-                if output_path and output_path.lower().endswith('.txt'):
+                if output_is_txt:
                      print(f"[Rebuild] Falling back to text-only rebuild for {output_path}")
                 else:
                     sys.exit(1) # Signal failure to Electron
             
-            from murasaki_translator.core.chunker import TextBlock
             blocks = []
-            for b_data in cache_data.get('blocks', []):
+            in_order = True
+            for b_data in cached_blocks:
+                block_id = b_data['index']
+                if blocks and block_id < blocks[-1].id:
+                    in_order = False
                 blocks.append(TextBlock(
-                    id=b_data['index'],
+                    id=block_id,
                     prompt_text=b_data['dst'], # Use dst as the new text
                     metadata=b_data.get('metadata') # Try to get metadata if saved (v2.1+)
                 ))
             
-            # Re-sort to ensure order
-            blocks.sort(key=lambda x: x.id)
+            # Re-sort to ensure order（缓存通常已按 index 有序，仅乱序时才排序）
+            if not in_order:
+                blocks.sort(key=lambda x: x.id)
             
             # Use DocumentFactory
-            if source_path and os.path.exists(source_path):
+            if has_source:
                 doc = DocumentFactory.get_document(source_path)
                 doc.load()
                 print(f"[Rebuild] Loaded document structure from: {source_path}")
                 doc.save(output_path, blocks)
-            elif output_path.lower().endswith('.txt'):
+            elif output_is_txt:
                 # Simple TXT rebuild
                 with open(output_path, 'w', encoding='utf-8') as f:
                     for b in blocks:
@@ -1287,13 +1904,14 @@ def main():
             
         except Exception as e:
             print(f"[Error] Rebuild failed: {e}")
-            import traceback
             traceback.print_exc()
             sys.exit(1)
 
     # ========================================
     # 单块翻译模式 (用于校对界面重翻)
     # ========================================
+    if args.daemon:
+        return run_single_block_daemon(args, parser)
     if args.single_block:
         return translate_single_block(args)
 
@@ -1309,20 +1927,10 @@ def main():
         glossary = {}
     else:
         # Try resolving path
-        if not os.path.exists(glossary_path):
-            # Try finding in glossaries subdirectory relative to script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            candidate = os.path.join(script_dir, 'glossaries', glossary_path)
-            if os.path.exists(candidate):
-                glossary_path = candidate
-            else:
-                # Try finding in glossaries subdirectory relative to CWD
-                candidate = os.path.join('glossaries', glossary_path)
-                if os.path.exists(candidate):
-                    glossary_path = candidate
-                else:
-                    print(f"[Warning] Glossary not found: {glossary_path} (checked absolute, script/glossaries, cwd/glossaries)")
-                    glossary_path = None # Indicate no valid glossary path found
+        resolved_glossary_path = _resolve_glossary_path(glossary_path)
+        if not resolved_glossary_path:
+            print(f"[Warning] Glossary not found: {glossary_path} (checked absolute, script/glossaries, cwd/glossaries)")
+        glossary_path = resolved_glossary_path # None indicates no valid glossary path found
         
         if glossary_path:
             glossary = load_glossary(glossary_path)
@@ -1330,11 +1938,18 @@ def main():
             glossary = {}
 
     # Determine Output Paths
-    _, file_ext = os.path.splitext(input_path)
+    # 扩展名及其分类只求值一次，后续格式判断都复用这些布尔量
+    file_ext = _file_ext(input_path)
+    is_subtitle_ext = file_ext in _SUBTITLE_EXTS
+    # ASS/SSA requires aggressive cleaning to prevent layout shifted by spaces
+    # SRT/TXT requires non-aggressive cleaning to preserve structural newlines
+    is_ass_format = file_ext in ('.ass', '.ssa')
+    is_epub = file_ext == '.epub'
+    is_txt = file_ext == '.txt'
     # Determine Architecture (Novel vs Structured vs Alignment)
     # is_structured: True for subtitle formats and alignment mode (which uses pseudo-SRT tags)
     # 注意：普通 .txt 文件无论使用何种模式都不需要额外的 .txt 后缀
-    is_structured = file_ext.lower() in ['.epub', '.srt', '.ass', '.ssa'] or args.alignment_mode
+    is_structured = is_epub or is_subtitle_ext or args.alignment_mode
     # is_structured_doc: 决定是否需要写入临时 .txt 文件（仅对二进制/结构化格式需要）
     is_structured_doc = is_structured  # 只有真正的结构化文档才需要临时 txt
 
@@ -1361,12 +1976,14 @@ def main():
     # Clean up OLD temp files in output directory (not glossary dir)
     try:
         out_dir = os.path.dirname(os.path.abspath(output_path))
-        for f in os.listdir(out_dir):
-            if f.endswith(".temp.jsonl") and f != os.path.basename(temp_progress_path):
-                full_p = os.path.join(out_dir, f)
-                # Clean files older than 24h
-                if time.time() - os.path.getmtime(full_p) > 86400:
-                    os.remove(full_p)
+        current_temp_name = os.path.basename(temp_progress_path)
+        # Clean files older than 24h（scandir 复用目录枚举结果，Windows 上免去逐文件 stat）
+        stale_before = time.time() - 86400
+        with os.scandir(out_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".temp.jsonl") and entry.name != current_temp_name:
+                    if entry.stat(follow_symlinks=False).st_mtime < stale_before:
+                        os.remove(entry.path)
     except Exception: pass
 
     # Load Glossary (Already loaded above)
@@ -1376,7 +1993,6 @@ def main():
     total_ctx = args.ctx * args.concurrency
 
     # Generate Configuration Fingerprint for Resume Integrity
-    import hashlib
     config_payload = {
         "chunk_size": args.chunk_size,
         "model": os.path.basename(args.model),
@@ -1401,10 +2017,18 @@ def main():
         "balance_threshold": args.balance_threshold,
         "balance_count": args.balance_count,
     }
-    config_hash = hashlib.sha256(json.dumps(config_payload, sort_keys=True).encode()).hexdigest()[:16]
+    config_hash = _config_fingerprint(config_payload)
     
     # Concurrency Warning (Flops/Bandwidth Bottleneck)
-    # Concurrency Warning (Flops/Bandwidth Bottleneck)
+    # 显存容量检查：并发槽的 KV Cache 放不下时会互相挤占，实际吞吐反而下降
+    if args.concurrency > 1 and not args.no_server_spawn:
+        vram_mb = nvidia_total_vram_mb()
+        if vram_mb and os.path.exists(args.model):
+            recommended = _estimate_max_parallel_slots(
+                vram_mb, os.path.getsize(args.model), args.ctx, args.kv_cache_type
+            )
+            if args.concurrency > recommended:
+                print(f"\n[Warning] Concurrency {args.concurrency} likely exceeds VRAM capacity ({vram_mb} MiB, ctx {args.ctx}, KV {args.kv_cache_type}). Recommended concurrency: <= {recommended}.")
     if args.concurrency >= 4:
         print(f"\n[Warning] Concurrency set to {args.concurrency} (>=4). High concurrency may decrease processing speed instead of increasing it.")
         print(f"[Tip] Real speed depends on GPU compute (FLOPs), bandwidth, and parallel processing quantity. If speed drops, try reducing concurrency.\n")
@@ -1443,7 +2067,7 @@ def main():
     
     # 2. ASS/SSA: Pseudo-SRT format with timestamps, indices
     # ~60-70% structural overhead, use 50% reduction
-    elif file_ext.lower() in ['.ass', '.ssa']:
+    elif is_ass_format:
         effective_chunk_size = int(args.chunk_size * 0.5)
         print(f"[Auto-Config] ASS format: chunk_size {args.chunk_size} -> {effective_chunk_size} (pseudo-SRT overhead)")
 
@@ -1462,27 +2086,21 @@ def main():
 
     
     # --- Unified Pipeline Injection ---
-    def add_unique_rule(rule_list, pattern, r_type='format', pos='append'):
-        if any(r.get('pattern') == pattern for r in rule_list): return
-        rule_obj = {"type": r_type, "pattern": pattern, "active": True}
-        if pos == 'prepend': rule_list.insert(0, rule_obj)
-        else: rule_list.append(rule_obj)
-
     # 1. Pre-rules
     pre_rules = load_rules(args.rules_pre) if args.rules_pre else []
     if args.fix_ruby:
-        add_unique_rule(pre_rules, "ruby_cleaner", pos='prepend')
+        _add_unique_rules(pre_rules, ("ruby_cleaner",), pos='prepend')
     
     # 2. Post-rules
     post_rules = load_rules(args.rules_post) if args.rules_post else []
-    if args.fix_kana:
-        add_unique_rule(post_rules, "kana_fixer")
-    if args.fix_punctuation:
-        add_unique_rule(post_rules, "punctuation_fixer")
-    if args.traditional:
-        add_unique_rule(post_rules, "traditional_chinese")
-
-    add_unique_rule(post_rules, "number_fixer")
+    _add_unique_rules(post_rules, [
+        pattern for pattern, enabled in (
+            ("kana_fixer", args.fix_kana),
+            ("punctuation_fixer", args.fix_punctuation),
+            ("traditional_chinese", args.traditional),
+            ("number_fixer", True),
+        ) if enabled
+    ])
     protect_rule_enabled, protect_rule_lines = _collect_protect_rule_lines(pre_rules)
     legacy_protect_lines = _collect_legacy_protect_lines(post_rules)
     text_protect_allowed = _allow_text_protect(input_path, args)
@@ -1501,35 +2119,45 @@ def main():
         legacy_protect_lines = []
 
     # [Formula Factory] Structured engineering
-    if is_structured:
-        # 规则熔断：针对字幕格式和对齐模式，剔除所有可能破坏换行或合并行数的规则
-        # Alignment Mode 必须享受同等的规则熔断待遇，否则 PostProcess 会破坏 @id@ 结构
-        is_sub = input_path.lower().endswith(('.srt', '.ass', '.ssa')) or args.alignment_mode
-        if is_sub:
-            melt_patterns = ['ensure_single_newline', 'ensure_double_newline', 'clean_empty_lines', 'merge_short_lines']
-            original_count = len(post_rules)
-            post_rules = [r for r in post_rules if r.get('pattern') not in melt_patterns]
-            if len(post_rules) < original_count:
-                print(f"[Auto-Config] Subtitle/Alignment detected. Disabled {original_count - len(post_rules)} formatting rules to preserve structure.")
+    # 规则熔断：针对字幕格式和对齐模式，剔除所有可能破坏换行或合并行数的规则
+    # Alignment Mode 必须享受同等的规则熔断待遇，否则 PostProcess 会破坏 @id@ 结构
+    is_sub = is_structured and (is_subtitle_ext or args.alignment_mode)
+    # 单次遍历：熔断格式规则，移除已有的 restore_protection（稍后统一追加到最末端），
+    # 并顺带记录保留下来的规则中是否启用了 ensure_double_newline（决定 block 分隔符）
+    melted_count = 0
+    use_double_newline_separator = False
+    kept_post_rules = []
+    for r in post_rules:
+        pattern = r.get('pattern')
+        if pattern == 'restore_protection':
+            continue
+        if is_sub and pattern in _MELT_PATTERNS:
+            melted_count += 1
+            continue
+        if pattern == 'ensure_double_newline' and r.get('active', True):
+            use_double_newline_separator = True
+        kept_post_rules.append(r)
+    post_rules = kept_post_rules
+    if melted_count:
+        print(f"[Auto-Config] Subtitle/Alignment detected. Disabled {melted_count} formatting rules to preserve structure.")
 
     if text_protect_allowed and args.protect_patterns and not args.text_protect:
         print("[Auto-Config] protect_patterns provided. Enabling TextProtector.")
         args.text_protect = True
 
     # [Critical Fix] 强制将样式还原逻辑置于所有后处理规则的最末端，确保还原后不会再次被误伤
-    # 先移除已有的（如果有），再追加到最后
-    post_rules = [r for r in post_rules if r.get('pattern') != 'restore_protection']
+    # 已有的在上方熔断遍历中移除，此处追加到最后
     if text_protect_allowed and args.text_protect:
-        add_unique_rule(post_rules, "restore_protection")
+        post_rules.append({"type": "format", "pattern": "restore_protection", "active": True})
         print("[Auto-Config] Ensured 'restore_protection' is the final post-processing rule.")
 
     custom_protector_patterns = None
     if text_protect_allowed:
-        if input_path.lower().endswith(('.srt', '.ass', '.ssa')):
+        if is_subtitle_ext:
             # [Specialized Rule] 针对字幕，优先使用合法的标签捕获规则，避免拦截 【】 （） [ ] 等
             custom_protector_patterns = TextProtector.SUBTITLE_PATTERNS
             print("[Auto-Config] Using restrictive SUBTITLE_PATTERNS for legal tags only.")
-        elif input_path.lower().endswith('.epub'):
+        elif is_epub:
             # [Specialized Rule] 针对 EPUB，保护 @id=ID@/@end=ID@ 锚点和可能残留的 HTML 标签
             custom_protector_patterns = [r'@id=\d+@', r'@end=\d+@', r'<[^>]+>']
             print("[Auto-Config] Using EPUB_ANCHOR_PATTERNS for @id=ID@ anchors.")
@@ -1559,41 +2187,46 @@ def main():
     post_processor = RuleProcessor(post_rules)
 
     # [Block Separator] 动态检测：如果后处理规则包含 ensure_double_newline，则 block 间使用双换行
-    # 这确保 block 内部和 block 之间的换行风格一致
-    use_double_newline_separator = any(
-        r.get('pattern') == 'ensure_double_newline' and r.get('active', True) 
-        for r in post_rules
-    )
+    # 这确保 block 内部和 block 之间的换行风格一致（标记已在规则熔断遍历中得出）
+    block_separator = "\n\n" if (use_double_newline_separator or args.mode == "chunk") else "\n"
 
     print(f"Loaded {len(pre_processor.rules)} pre-processing rules.")
     print(f"Loaded {len(post_processor.rules)} post-processing rules.")
 
+    # Bound up front so the except/finally handlers can test them directly
+    translation_cache = None
+    temp_progress_file = None
     try:
-        engine.start_server()
-        
-        
-        if args.alignment_mode and input_path.lower().endswith('.txt'):
-            print(f"[Alignment Mode] ENABLED: Context-aware alignment for {input_path}")
-            items, structure_map, source_lines = AlignmentHandler.load_lines(input_path)
-            # Use normal chunker for context!
-            blocks = chunker.process(items)
-            print(f"[Alignment Mode] Tagged lines merged into {len(blocks)} context blocks.")
-            doc = None # Not used here
-        else:
-            doc = DocumentFactory.get_document(input_path)
-            items = doc.load()
+        # 服务端启动（等待模型加载）与文档读取/分块互不依赖：后台启动，主线程同时做 CPU 侧准备，
+        # 进入翻译流程前再等待就绪（见 _prepare_while_server_starts）
+        def prepare_input():
+            if args.alignment_mode and is_txt:
+                print(f"[Alignment Mode] ENABLED: Context-aware alignment for {input_path}")
+                items, structure_map, source_lines = AlignmentHandler.load_lines(input_path)
+                _, source_chars = _source_text_stats(items)
+                # Use normal chunker for context!
+                blocks = chunker.process(items)
+                print(f"[Alignment Mode] Tagged lines merged into {len(blocks)} context blocks.")
+                doc = None # Not used here
+            else:
+                doc = DocumentFactory.get_document(input_path)
+                items = doc.load()
             
-            # Source Lines Calculation (for Novel/Chunk mode)
-            # For Alignment Mode, source_lines is already exact physical count needed for reconstruction
-            source_lines = len([i for i in items if i['text'].strip()])
-            structure_map = {} # Not used
+                # Source Lines Calculation (for Novel/Chunk mode)
+                # For Alignment Mode, source_lines is already exact physical count needed for reconstruction
+                source_lines, source_chars = _source_text_stats(items)
+                structure_map = {} # Not used
             
-            # Chunking
-            blocks = chunker.process(items)
-            print(f"[{args.mode.upper()} Mode] Input split into {len(blocks)} blocks.")
-        
-        # Helper for printing stats (Alignment mode has already calculated exact source lines)
-        source_chars = sum(len(i['text']) for i in items if i['text'].strip())
+                # Chunking
+                blocks = chunker.process(items)
+                print(f"[{args.mode.upper()} Mode] Input split into {len(blocks)} blocks.")
+
+            gpu_name = get_gpu_name()  # Get GPU Name once
+            display_name, params, quant = format_model_info(args.model)
+            return items, structure_map, source_lines, source_chars, blocks, doc, gpu_name, display_name, params, quant
+
+        (items, structure_map, source_lines, source_chars, blocks, doc,
+         gpu_name, display_name, params, quant) = _prepare_while_server_starts(engine, prepare_input)
         
         # Debug output (only when --debug is enabled)
         if args.debug:
@@ -1611,7 +2244,7 @@ def main():
         total_gen_tokens = 0 # Track total generated tokens (for smooth speed)
         total_gen_time = 0 # Track total generation duration (for smooth speed)
         total_lines = 0 # Track total output lines for stats
-        last_progress_time = 0 # For rate limiting
+        last_progress_time = float("-inf") # For rate limiting (time.monotonic)
         
         # 初始化翻译缓存（用于校对界面）
         translation_cache = TranslationCache(output_path, custom_cache_dir=args.cache_path, source_path=input_path) if args.save_cache else None
@@ -1666,9 +2299,6 @@ def main():
                 f"Total={len(custom_protector_patterns)}"
             )
         
-        gpu_name = get_gpu_name()  # Get GPU Name once
-        display_name, params, quant = format_model_info(args.model)
-        
         print("\nStarting Translation...")
         print(f"Output: {output_path}")
         if args.save_cot:
@@ -1803,16 +2433,28 @@ def main():
         resume_config_matched = False
         
         # Order-Sensitive Initialization
-        all_results = [None] * len(blocks) # Pre-fill for structural reconstruction
+        # Pre-fill for structural reconstruction; each slot holds (out_text, success)
+        all_results = [None] * len(blocks)
+        any_failed = False  # 任一块失败时，重建需回退原文
+
+        # 纯 TXT 且无需同步校对缓存时，已有输出无需读入内存：原地截断后追加续写
+        resume_in_place = args.resume and not is_structured_doc and not translation_cache
 
+        block_line_counts = None
         if args.resume:
-            existing_lines, existing_content, is_valid = load_existing_output(actual_output_path)
+            # 逐块源文本行数：跳过计算、内存重建与原地截断共用，只统计一次
+            block_line_counts = [b.prompt_text.count('\n') + 1 for b in blocks]
+            existing_lines, existing_content, is_valid = load_existing_output(
+                actual_output_path, keep_content=not resume_in_place
+            )
             if existing_lines == -1:
                 print("[Resume] Output file already complete. Nothing to do.")
                 return
             elif is_valid and existing_lines > 0:
                 # Pass mode to skip block calculation
-                skip_blocks_from_output = calculate_skip_blocks(blocks, existing_lines, is_chunk_mode=(args.mode == "chunk"))
+                skip_blocks_from_output = calculate_skip_blocks(
+                    blocks, existing_lines, is_chunk_mode=(args.mode == "chunk"), line_counts=block_line_counts
+                )
                 if skip_blocks_from_output >= len(blocks):
                     print(f"[Resume] All {len(blocks)} blocks already translated. Nothing to do.")
                     return
@@ -1825,16 +2467,21 @@ def main():
             # Returns: {block_idx: result_dict}
             if os.path.exists(temp_progress_path):
                 try:
-                    with open(temp_progress_path, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                        if lines:
+                    with open(temp_progress_path, 'rb') as f:
+                        # 逐行流式读取，不把整个进度文件（含 CoT）读入列表
+                        header_line = next(f, None)
+                        if header_line is not None:
                             # First line should be config fingerprint
                             try:
-                                header = json.loads(lines[0])
+                                header = _loads_json_line(header_line)
                                 if header.get("type") == "fingerprint":
-                                    if header.get("hash") == config_hash:
+                                    saved_hash = header.get("hash")
+                                    if saved_hash == config_hash:
                                         resume_config_matched = True
                                         logger.info(f"[Resume] Config fingerprint matched ({config_hash}).")
+                                    elif saved_hash == _legacy_config_fingerprint(config_payload):
+                                        resume_config_matched = True
+                                        logger.info(f"[Resume] Legacy config fingerprint matched ({saved_hash}).")
                                     else:
                                         logger.warning(f"[Resume] Config mismatch! (Saved: {header.get('hash')}, Current: {config_hash}). Restarting.")
                                 else:
@@ -1843,8 +2490,12 @@ def main():
                                 logger.warning("[Resume] Invalid fingerprint header. Restarting.")
 
                             if resume_config_matched:
-                                for line in lines[1:]: # Skip fingerprint
-                                     data = json.loads(line)
+                                for line in f: # Fingerprint already consumed
+                                     try:
+                                         data = _loads_json_line(line)
+                                     except ValueError:
+                                         # Torn line from an interrupted batch flush
+                                         continue
                                      idx = data.get('block_idx')
                                      if idx is not None:
                                          precalculated_temp[idx] = data
@@ -1855,23 +2506,27 @@ def main():
             
             # [Audit Fix] Fill skipped blocks from output file to support EPUB/SRT reconstruction
             # This MUST happen before Precision Resume Alignment
-            if skip_blocks_from_output > 0:
+            if skip_blocks_from_output > 0 and not resume_in_place:
                 print(f"[Resume] Rebuilding memory state for {skip_blocks_from_output} skipped blocks...")
                 current_line_ptr = 0
+                restored_cache_entries = []  # 跳过块的缓存条目，循环结束后一次性加入 translation_cache
                 for idx in range(skip_blocks_from_output):
+                    restored = None
                     # 1. Try to find in temp progress file first (contains full metadata/cot)
                     if idx in precalculated_temp:
-                         all_results[idx] = precalculated_temp[idx]
+                         restored = precalculated_temp[idx]
                     # 2. Extract from existing output file (requires physical line alignment)
                     elif existing_content:
-                        block_lines_count = blocks[idx].prompt_text.count('\n') + 1
+                        block_lines_count = block_line_counts[idx]
                         block_lines = existing_content[current_line_ptr : current_line_ptr + block_lines_count]
                         
                         if block_lines:
-                            all_results[idx] = {
+                            # 每块只拼接一次，out_text 与 preview_text 共用；不构造整篇文本
+                            block_text = '\n'.join(block_lines)
+                            restored = {
                                 "success": True,
-                                "out_text": '\n'.join(block_lines),
-                                "preview_text": '\n'.join(block_lines),
+                                "out_text": block_text,
+                                "preview_text": block_text,
                                 "block_idx": idx,
                                 "is_restorer": True,
                                 "warnings": [],
@@ -1882,74 +2537,127 @@ def main():
                         else:
                             print(f"[Resume] Warning: Could not find content for block {idx} in existing output.")
                     
+                    if restored is not None:
+                        all_results[idx] = (restored.get('out_text'), restored.get('success'))
+                        if not restored.get('success'):
+                            any_failed = True
+                        # [Fix] Synchronize skipped blocks to TranslationCache to prevent data loss on final save
+                        if translation_cache:
+                            # Extract warning types from result
+                            w_types = [w['type'] if isinstance(w, dict) else w for w in restored.get("warnings", [])]
+                            restored_cache_entries.append((
+                                idx, 
+                                restored.get('src_text', ''), 
+                                restored.get('preview_text', restored.get('out_text', '')), 
+                                w_types, 
+                                restored.get("cot", ""), 
+                                restored.get("retry_history", [])
+                            ))
+                    
                     # Advance pointer (account for chunk mode spacer if applicable)
-                    block_lines_count = blocks[idx].prompt_text.count('\n') + 1
+                    block_lines_count = block_line_counts[idx]
                     current_line_ptr += (block_lines_count + 1) if args.mode == "chunk" else block_lines_count
                 
-                # [Fix] Synchronize skipped blocks to TranslationCache to prevent data loss on final save
                 if translation_cache:
-                    for idx in range(skip_blocks_from_output):
-                        if all_results[idx] is not None:
-                            res = all_results[idx]
-                            # Extract warning types from result
-                            w_types = [w['type'] if isinstance(w, dict) else w for w in res.get("warnings", [])]
-                            translation_cache.add_block(
-                                idx, 
-                                res.get('src_text', ''), 
-                                res.get('preview_text', res.get('out_text', '')), 
-                                w_types, 
-                                res.get("cot", ""), 
-                                res.get("retry_history", [])
-                            )
+                    translation_cache.add_blocks(restored_cache_entries)
                     logger.info(f"[Cache] Synchronized {skip_blocks_from_output} skipped blocks to memory.")
         
         # [Precision Resume] Determine how much content to KEEP from existing file
         # We rewrite the file instead of plain append ('a') to ensure perfect structural alignment
         # and eliminate residual/incomplete data from the previous crash.
-        keep_content_str = ""
+        # 保留内容按块存放，打开输出文件后逐段写出，不再拼接整份文档
+        rebuilt_parts = []
         if skip_blocks_from_output > 0 and existing_content:
             # Reconstruct the exact text that SHOULD be in the file for the skipped blocks
             # This accounts for mode (chunk vs line) and separators
-            rebuilt_parts = []
             for i in range(skip_blocks_from_output):
-                if all_results[i] and all_results[i].get('success'):
-                    rebuilt_parts.append(all_results[i]['out_text'])
+                if all_results[i] and all_results[i][1]:
+                    rebuilt_parts.append(all_results[i][0])
                 else:
                     # Fallback to source if missing (should not happen with resume integrity)
                     rebuilt_parts.append(blocks[i].prompt_text)
             
-            block_separator = "\n\n" if (use_double_newline_separator or args.mode == "chunk") else "\n"
-            keep_content_str = block_separator.join(rebuilt_parts) + block_separator
-            
-            # Update counters based on what we are KEEPING
-            total_lines = keep_content_str.count('\n') # Rough approximation
-            total_out_chars = len(keep_content_str)
+            # Update counters based on what we are KEEPING (each part is followed by block_separator)
+            total_lines = sum(part.count('\n') for part in rebuilt_parts) + block_separator.count('\n') * len(rebuilt_parts) # Rough approximation
+            total_out_chars = sum(map(len, rebuilt_parts)) + len(block_separator) * len(rebuilt_parts)
             print(f"[Resume] Precision alignment: Keeping {skip_blocks_from_output} blocks ({total_out_chars} chars).")
 
-        # Open output file: Always use 'w' and write kept content to ensure truncation of junk
+        # Open output file: use 'w' and write kept content to ensure truncation of junk,
+        # or truncate in place and append when the kept lines are already on disk
         output_mode = 'w'
+        if resume_in_place and skip_blocks_from_output > 0:
+            keep_lines = sum(block_line_counts[:skip_blocks_from_output])
+            if args.mode == "chunk":
+                keep_lines += skip_blocks_from_output  # 分块模式每块后多一个空行
+            truncate_existing_output(actual_output_path, keep_lines)
+            output_mode = 'a'
+            print(f"[Resume] Precision alignment: Keeping {skip_blocks_from_output} blocks ({keep_lines} lines) in place.")
         
         # Prepare Temp Output File (Append or Create)
-        temp_file_mode = 'a' if (args.resume and len(precalculated_temp) > 0 and resume_config_matched) else 'w'
-        temp_progress_file = open(temp_progress_path, temp_file_mode, encoding='utf-8', buffering=1)
+        # 以二进制打开：每块结果由 _dumps_json_bytes 直接序列化为 UTF-8 字节写入
+        temp_file_mode = 'ab' if (args.resume and len(precalculated_temp) > 0 and resume_config_matched) else 'wb'
+        temp_progress_file = open(temp_progress_path, temp_file_mode, buffering=OUTPUT_BUFFER_SIZE)
+        temp_pending = 0
+        last_temp_flush = time.monotonic()
+        last_output_flush = last_temp_flush
         
         # If starting fresh, write fingerprint
-        if temp_file_mode == 'w':
-            temp_progress_file.write(json.dumps({"type": "fingerprint", "hash": config_hash}) + "\n")
+        if temp_file_mode == 'wb':
+            temp_progress_file.write(json.dumps({"type": "fingerprint", "hash": config_hash}).encode('utf-8') + b"\n")
             temp_progress_file.flush()
         
-        cot_context = open(cot_path, 'w', encoding='utf-8', buffering=1) if args.save_cot else nullcontext()
-        with open(actual_output_path, output_mode, encoding='utf-8', buffering=1) as f_out, \
+        cot_context = open(cot_path, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) if args.save_cot else nullcontext()
+        with open(actual_output_path, output_mode, encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f_out, \
              cot_context as f_cot:
 
             # Write kept content immediately if resuming
-            if keep_content_str:
-                f_out.write(keep_content_str)
+            if rebuilt_parts:
+                for part in rebuilt_parts:
+                    f_out.write(part)
+                    f_out.write(block_separator)
                 f_out.flush()
             
             # ========================================
             # Parallel Worker Function
             # ========================================
+            # 整个任务内不变的量在此求值一次，由 worker 闭包捕获
+            pause_file = output_path + ".pause"
+
+            def run_pre_rules(text: str, strict_mode: bool) -> str:
+                return pre_processor.process(text, strict_line_count=strict_mode)
+
+            # 前处理规则对相同输入结果相同：重复块（样板段落、空白块等）命中缓存即可跳过整轮规则。
+            # 用户 python 脚本规则可能有副作用/非确定，存在时不缓存
+            if not any(r.get('type') == 'python' and r.get('active', True) for r in pre_processor.rules):
+                run_pre_rules = lru_cache(maxsize=PRE_RULE_CACHE_SIZE)(run_pre_rules)
+
+            def prepare_block_source(block_idx: int, block: object, strict_mode: bool = False):
+                """Pre-processing pipeline: pre-rules -> Normalizer -> TextProtector"""
+                logger.debug(f"[Block {block_idx+1}] Pre-processing start (len: {len(block.prompt_text)})")
+                processed_src_text = run_pre_rules(block.prompt_text, strict_mode)
+                logger.debug(f"[Block {block_idx+1}] After Pre-rules: {len(processed_src_text)} chars")
+                
+                processed_src_text = Normalizer.normalize(processed_src_text)
+                
+                # Thread-Safe Text Protector (Local instantiation)
+                # Use custom_protector_patterns captured from outer scope
+                local_protector = None
+                if args.text_protect:
+                     # Aggressive cleaning follows the file type (is_ass_format, resolved once above)
+                     local_protector = TextProtector(
+                         patterns=custom_protector_patterns, 
+                         block_id=block_idx + 1,
+                         aggressive_cleaning=is_ass_format
+                     )
+                     logger.debug(f"[Block {block_idx+1}] [Experimental] Protection start")
+                     processed_src_text = local_protector.protect(processed_src_text)
+                     logger.debug(f"[Block {block_idx+1}] [Experimental] After Protection: {len(processed_src_text)} chars")
+                return processed_src_text, local_protector
+
+            # 预取：后台单线程提前对后续块做预处理，与引擎推理重叠；worker 取走结果，未开始的预取直接取消并就地计算
+            prefetch_depth = max(0, getattr(args, "prefetch_depth", 0) or 0)
+            prefetcher = None  # 启用时在提交任务前创建
+
             def process_block_task(block_idx: int, block: object, strict_mode: bool = False):
                 """Worker Task"""
                 logger.info(f"[Block {block_idx+1}/{len(blocks)}] Starting translation...")
@@ -1972,35 +2680,14 @@ def main():
 
                 try:
                     # Pause Check (Worker level sleeping)
-                    pause_file = output_path + ".pause"
-                    while os.path.exists(pause_file):
-                         time.sleep(1)
-                    
-                    # Pre-processing using Unified RuleProcessor
-                    logger.debug(f"[Block {block_idx+1}] Pre-processing start (len: {len(block.prompt_text)})")
-                    processed_src_text = pre_processor.process(block.prompt_text, strict_line_count=strict_mode)
-                    logger.debug(f"[Block {block_idx+1}] After Pre-rules: {len(processed_src_text)} chars")
+                    _wait_while_paused(pause_file)
                     
-                    processed_src_text = Normalizer.normalize(processed_src_text)
-                    
-                    # Thread-Safe Text Protector (Local instantiation)
-                    # Use custom_protector_patterns captured from outer scope
-                    local_protector = None
-                    if args.text_protect:
-                         # Determine aggressive cleaning based on file type for thread-safe instance
-                         # ASS/SSA requires aggressive cleaning to prevent layout shifted by spaces
-                         # SRT/TXT requires non-aggressive cleaning to preserve structural newlines
-                         _, ext = os.path.splitext(input_path)
-                         is_ass_format = ext.lower() in ['.ass', '.ssa']
-                         
-                         local_protector = TextProtector(
-                             patterns=custom_protector_patterns, 
-                             block_id=block_idx + 1,
-                             aggressive_cleaning=is_ass_format
-                         )
-                         logger.debug(f"[Block {block_idx+1}] [Experimental] Protection start")
-                         processed_src_text = local_protector.protect(processed_src_text)
-                         logger.debug(f"[Block {block_idx+1}] [Experimental] After Protection: {len(processed_src_text)} chars")
+                    # Pre-processing using Unified RuleProcessor (possibly already prefetched)
+                    prepared = prefetcher.claim(block_idx) if prefetcher is not None else None
+                    if prepared is not None:
+                        processed_src_text, local_protector = prepared.result()
+                    else:
+                        processed_src_text, local_protector = prepare_block_source(block_idx, block, strict_mode)
                     
                     # Pre-processing & Protection happens locally in caller
                     # because they might vary (different blocks/pattern instances)
@@ -2052,228 +2739,318 @@ def main():
             
             # Use ThreadPoolExecutor
             max_workers = args.concurrency
-            executor = ThreadPoolExecutor(max_workers=max_workers)
+            prefetch_executor = ThreadPoolExecutor(max_workers=1) if prefetch_depth > 0 else None
+            # 上下文管理执行器：正常结束与异常路径均由 with 负责回收工作线程
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                try:
             
-            # Submit all tasks
-            # We maintain a map of future -> index
-            future_to_index = {}
+                    # Submit all tasks
+                    # We maintain a map of future -> index
+                    future_to_index = {}
+                    # 完成队列：每个 future 完成时由回调入队，结果循环按完成顺序逐个取出（无需 as_completed 的等待器）
+                    done_queue = SimpleQueue()
             
 
-            # Determine if we should use strict line count (Retry if line count mismatch)
-            _, file_ext = os.path.splitext(input_path)
-            # [CRITICAL FIX] Do NOT re-calculate is_structured_doc here! 
-            # It was already determined globally (lines ~770) and includes args.alignment_mode.
-            # Re-calculating purely on extension would disable alignment mode for .txt.
+                    # Determine if we should use strict line count (Retry if line count mismatch)
+                    # [CRITICAL FIX] Do NOT re-calculate is_structured_doc here! 
+                    # It was already determined globally (lines ~770) and includes args.alignment_mode.
+                    # Re-calculating purely on extension would disable alignment mode for .txt.
             
-            # Strict mode logic:
-            # - all: Force strict line count for EVERY file
-            # - subs: Force for subtitles (.srt, .ass, .ssa) and .epub
-            # - off: Disable strict 1:1 matching (use tolerance-based line check if enabled)
-            if args.strict_mode == "all":
-                enforce_strict_alignment = True
-            elif args.strict_mode == "off":
-                enforce_strict_alignment = False
-            else: # "subs"
-                enforce_strict_alignment = is_structured_doc
-
-            if enforce_strict_alignment:
-                print(f"[Init] Strict Line Count Mode ACTIVE (Policy: {args.strict_mode}). Output MUST match source line count.")
-            else:
-                print(f"[Init] Strict Line Count Mode INACTIVE (Policy: {args.strict_mode}).")
+                    # Strict mode logic:
+                    # - all: Force strict line count for EVERY file
+                    # - subs: Force for subtitles (.srt, .ass, .ssa) and .epub
+                    # - off: Disable strict 1:1 matching (use tolerance-based line check if enabled)
+                    if args.strict_mode == "all":
+                        enforce_strict_alignment = True
+                    elif args.strict_mode == "off":
+                        enforce_strict_alignment = False
+                    else: # "subs"
+                        enforce_strict_alignment = is_structured_doc
+
+                    if enforce_strict_alignment:
+                        print(f"[Init] Strict Line Count Mode ACTIVE (Policy: {args.strict_mode}). Output MUST match source line count.")
+                    else:
+                        print(f"[Init] Strict Line Count Mode INACTIVE (Policy: {args.strict_mode}).")
+
+                    print(f"Starting execution with {max_workers} threads...")
+
+                    # 预取候选：需要真正翻译的非空块；前 max_workers 个会被 worker 立即领取，预取从其后开始
+                    prefetch_queue = []
+
+                    # 待执行块（续翻跳过的除外）；任务按窗口分批提交，执行器队列中至多 submit_window 个未完成任务，
+                    # 其余块在结果循环每取走一个结果时补交一个，避免一次性为整本书创建全部 future
+                    pending_task_indices = []
+                    # 逐块是否非空（空块仅用于负载均衡占位，不计入有效进度）：启动时判定一次，进度统计直接查表
+                    block_is_effective = [bool(b.prompt_text) and not b.prompt_text.isspace() for b in blocks]
+                    for i, block in enumerate(blocks):
+                        # Resume skip
+                        if i < skip_blocks_from_output:
+                            continue
+                        pending_task_indices.append(i)
+                        if prefetch_executor is not None and i not in precalculated_temp and block_is_effective[i]:
+                            prefetch_queue.append(i)
+                    if prefetch_executor is not None:
+                        # 须在提交任务前创建，worker 的 claim 才不会漏登记
+                        prefetcher = _BlockPrefetcher(
+                            prefetch_executor,
+                            lambda idx: prepare_block_source(idx, blocks[idx], enforce_strict_alignment),
+                            prefetch_depth, prefetch_queue, start=max_workers,
+                        )
+                    submit_window = max(1, max_workers * SUBMIT_WINDOW_PER_WORKER)
+                    submit_cursor = 0
+
+                    def submit_next_task():
+                        nonlocal submit_cursor
+                        i = pending_task_indices[submit_cursor]
+                        submit_cursor += 1
+                        # Check temp progress
+                        if i in precalculated_temp:
+                            future = executor.submit(restore_block_task, i, precalculated_temp[i])
+                            print(f"  - Restoring Block {i+1} from temp file...")
+                        else:
+                            # Pass enforce_strict_alignment to task
+                            future = executor.submit(process_block_task, i, blocks[i], enforce_strict_alignment)
+                        future_to_index[future] = i
+                        future.add_done_callback(done_queue.put)
 
-            print(f"Starting execution with {max_workers} threads...")
-            
-            for i, block in enumerate(blocks):
-                # Resume skip
-                if i < skip_blocks_from_output:
-                    continue
-                
-                # Check temp progress
-                if i in precalculated_temp:
-                    future = executor.submit(restore_block_task, i, precalculated_temp[i])
-                    print(f"  - Restoring Block {i+1} from temp file...")
-                else:
-                    # Pass enforce_strict_alignment to task
-                    future = executor.submit(process_block_task, i, block, enforce_strict_alignment)
-                
-                future_to_index[future] = i
+                    while submit_cursor < len(pending_task_indices) and submit_cursor < submit_window:
+                        submit_next_task()
+
+                    if prefetcher is not None:
+                        prefetcher.schedule()
             
-            # Note: EPUB/SRT reconstruction handled by memory rebuild logic above (skip_blocks_from_output)
+                    # Note: EPUB/SRT reconstruction handled by memory rebuild logic above (skip_blocks_from_output)
             
-            # --- Execution Status Initialization ---
-            results_buffer = {}
-            preview_sent = set()
-            next_write_idx = skip_blocks_from_output
+                    # --- Execution Status Initialization ---
+                    # Slot array indexed by block_idx; a non-None slot is a finished block awaiting ordered write
+                    results_buffer = [None] * len(blocks)
+                    preview_sent = set()
+                    # 仅在有前端订阅时（stdout 被管道接管）发送块预览；预览文本仍需为校对缓存计算
+                    emit_preview = not getattr(args, "no_preview", False) and not sys.stdout.isatty()
+                    cache_enabled = translation_cache is not None
+                    next_write_idx = skip_blocks_from_output
             
-            # 统计修正：过滤掉空块（用于负载均衡的占位块）
-            effective_blocks_indices = [idx for idx, b in enumerate(blocks) if b.prompt_text.strip()]
-            total_tasks_count = len(future_to_index)
-            effective_total = len(effective_blocks_indices)
-            completed_count = 0 
-            effective_completed = 0
+                    # 统计修正：过滤掉空块（用于负载均衡的占位块）
+                    total_tasks_count = len(pending_task_indices)
+                    effective_total = sum(block_is_effective)
+                    completed_count = 0 
+                    effective_completed = 0
+                    # 续翻跳过的非空块数在循环中恒定，预先计算一次
+                    skipped_nonempty = sum(block_is_effective[:skip_blocks_from_output])
             
-            # Session Stats for real-time speed (excluding restored blocks)
-            session_out_chars = 0
-            session_out_lines = 0 
+                    # Session Stats for real-time speed (excluding restored blocks)
+                    session_out_chars = 0
+                    session_out_lines = 0 
             
-            # Main result processing loop
-            for future in as_completed(future_to_index):
-                    block_idx = future_to_index[future]
-                    try:
-                        result = future.result() 
-                    except Exception as e:
-                        safe_print(f"Worker Error for Block {block_idx+1}: {e}")
-                        result = {
-                            "success": False, "error": str(e), "block_idx": block_idx,
-                            "src_text": blocks[block_idx].prompt_text if block_idx < len(blocks) else "Unknown",
-                            "out_text": "[Worker Exception]", "preview_text": "[Worker Exception]",
-                            "cot": "", "raw_output": "", "warnings": [],
-                            "lines_count": 0, "chars_count": 0, "cot_chars": 0, "usage": None
-                        }
-                    
-                    # Store results in buffer for ordered processing
-                    results_buffer[block_idx] = result
-                    completed_count += 1
-                    if result["src_text"].strip():
-                        effective_completed += 1
-                        
-                    # Stats processing
-                    if result["success"]:
-                        total_out_chars += len(result["out_text"])
-                        total_lines += result["lines_count"]
-                        total_cot_chars += result["cot_chars"]
-                        
-                        # Fix for Resume Mode Speed Spike:
-                        # Only count stats for REAL GEN tasks towards speed calculation
-                        # "is_restorer" results are instant and distort the speed metric
-                        is_generated_block = not result.get("is_restorer", False)
-                        if is_generated_block:
-                            session_out_chars += (len(result["out_text"]) + result.get("cot_chars", 0))
-                            session_out_lines += result.get("lines_count", 0)
-                            if result.get("usage"):
-                                total_prompt_tokens += result["usage"].get("prompt_tokens", 0)
-                                total_gen_tokens += result["usage"].get("completion_tokens", 0)
-                            
-                        
-                        if block_idx not in precalculated_temp:
+                    # Main result processing loop
+                    for _ in range(total_tasks_count):
+                            future = done_queue.get()
+                            block_idx = future_to_index.pop(future)
+                            # 补交下一个任务，保持提交窗口满载
+                            if submit_cursor < len(pending_task_indices):
+                                submit_next_task()
                             try:
-                                temp_line = json.dumps(result, ensure_ascii=False)
-                                temp_progress_file.write(temp_line + "\n")
-                                temp_progress_file.flush()
+                                result = future.result() 
                             except Exception as e:
-                                logger.debug(f"[TempProgress] Write failed: {e}")
-                        
-                        block_src_text = result["src_text"]
-                        total_source_chars += len(block_src_text)
-                        total_source_lines += len([l for l in block_src_text.splitlines() if l.strip()])
-                        
-                        # Emit preview as soon as a block finishes (out-of-order allowed)
-                        if block_idx not in preview_sent:
-                            if args.alignment_mode:
-                                preview_text = AlignmentHandler.process_result(result.get("out_text", ""))
-                            else:
-                                preview_text = result.get("preview_text") or result.get("out_text", "")
-                            result["preview_text"] = preview_text
-                            safe_print_json(
-                                "JSON_PREVIEW_BLOCK",
-                                {
-                                    "block": block_idx + 1,
-                                    "src": result.get("src_text", ""),
-                                    "output": preview_text
+                                safe_print(f"Worker Error for Block {block_idx+1}: {e}")
+                                result = {
+                                    "success": False, "error": str(e), "block_idx": block_idx,
+                                    "src_text": blocks[block_idx].prompt_text if block_idx < len(blocks) else "Unknown",
+                                    "out_text": "[Worker Exception]", "preview_text": "[Worker Exception]",
+                                    "cot": "", "raw_output": "", "warnings": [],
+                                    "lines_count": 0, "chars_count": 0, "cot_chars": 0, "usage": None
                                 }
-                            )
-                            preview_sent.add(block_idx)
+                    
+                            # 本轮产生的 JSON 事件（预览/进度/警告）先收集，轮末一次写出并 flush
+                            pending_events = []
+
+                            # Store results in buffer for ordered processing
+                            results_buffer[block_idx] = result
+                            completed_count += 1
+                            if prefetcher is not None:
+                                prefetcher.schedule()
+                            if block_is_effective[block_idx]:
+                                effective_completed += 1
                         
-                        # Progress reporting
-                        elapsed_so_far = max(0.1, time.time() - start_time)
+                            # Stats processing
+                            if result["success"]:
+                                total_out_chars += len(result["out_text"])
+                                total_lines += result["lines_count"]
+                                total_cot_chars += result["cot_chars"]
                         
-                        # Speed Calculation uses SESSION stats only
-                        current_speed_chars = session_out_chars / elapsed_so_far
+                                # Fix for Resume Mode Speed Spike:
+                                # Only count stats for REAL GEN tasks towards speed calculation
+                                # "is_restorer" results are instant and distort the speed metric
+                                is_generated_block = not result.get("is_restorer", False)
+                                if is_generated_block:
+                                    session_out_chars += (len(result["out_text"]) + result.get("cot_chars", 0))
+                                    session_out_lines += result.get("lines_count", 0)
+                                    if result.get("usage"):
+                                        total_prompt_tokens += result["usage"].get("prompt_tokens", 0)
+                                        total_gen_tokens += result["usage"].get("completion_tokens", 0)
+                            
                         
-                        avg_time_per_block = elapsed_so_far / max(1, completed_count)
-                        remaining_time = (total_tasks_count - completed_count) * avg_time_per_block
+                                if block_idx not in precalculated_temp:
+                                    try:
+                                        temp_progress_file.write(_dumps_json_bytes(result) + b"\n")
+                                        # Checkpoint in batches; a crash loses at most one batch of resume data
+                                        temp_pending += 1
+                                        if temp_pending >= TEMP_PROGRESS_FLUSH_BLOCKS or time.monotonic() - last_temp_flush > TEMP_PROGRESS_FLUSH_SECS:
+                                            temp_progress_file.flush()
+                                            temp_pending = 0
+                                            last_temp_flush = time.monotonic()
+                                    except Exception as e:
+                                        logger.debug(f"[TempProgress] Write failed: {e}")
                         
-                        progress_data = {
-                            "current": effective_completed + len([idx for idx in range(skip_blocks_from_output) if blocks[idx].prompt_text.strip()]),
-                            "ordered_current": next_write_idx, "total": effective_total,
-                            "percent": ((effective_completed + len([idx for idx in range(skip_blocks_from_output) if blocks[idx].prompt_text.strip()])) / max(1, effective_total)) * 100,
-                            "total_chars": total_out_chars, "total_lines": total_lines,
-                            "source_chars": total_source_chars, "source_lines": total_source_lines, 
-                            "speed_chars": round(current_speed_chars, 1), "speed_lines": round(session_out_lines / elapsed_so_far, 2),
-                            "speed_gen": round(total_gen_tokens / elapsed_so_far, 1), "speed_eval": round(total_prompt_tokens / elapsed_so_far, 1),
-                            "total_tokens": total_gen_tokens, "elapsed": elapsed_so_far, "remaining": int(remaining_time)
-                        }
+                                block_src_text = result["src_text"]
+                                total_source_chars += len(block_src_text)
+                                total_source_lines += len([l for l in block_src_text.splitlines() if l.strip()])
                         
-                        now = time.time()
-                        if (now - last_progress_time > 0.1) or (completed_count == total_tasks_count):
-                            safe_print_json("JSON_PROGRESS", progress_data)
-                            last_progress_time = now
-
-                    # Ordered write to file (consuming from results_buffer)
-                    while next_write_idx in results_buffer:
-                        res = results_buffer.pop(next_write_idx)
-                        curr_disp = next_write_idx + 1
+                                # Emit preview as soon as a block finishes (out-of-order allowed)
+                                if block_idx not in preview_sent and (emit_preview or cache_enabled):
+                                    if args.alignment_mode:
+                                        preview_text = AlignmentHandler.process_result(result.get("out_text", ""))
+                                    else:
+                                        preview_text = result.get("preview_text") or result.get("out_text", "")
+                                    result["preview_text"] = preview_text
+                                    if emit_preview:
+                                        pending_events.append((
+                                            "JSON_PREVIEW_BLOCK",
+                                            {
+                                                "block": block_idx + 1,
+                                                "src": result.get("src_text", ""),
+                                                "output": preview_text
+                                            }
+                                        ))
+                                        preview_sent.add(block_idx)
+                        
+                                # Progress reporting (rate limited; payload is only built when it is emitted)
+                                now = time.monotonic()
+                                if (now - last_progress_time > 0.1) or (completed_count == total_tasks_count):
+                                    elapsed_so_far = max(0.1, time.time() - start_time)
+                                    inv_elapsed = 1.0 / elapsed_so_far  # elapsed_so_far >= 0.1, never zero
+                            
+                                    # Speed Calculation uses SESSION stats only
+                                    current_speed_chars = session_out_chars * inv_elapsed
+                            
+                                    avg_time_per_block = elapsed_so_far / max(1, completed_count)
+                                    remaining_time = (total_tasks_count - completed_count) * avg_time_per_block
+                            
+                                    effective_done = effective_completed + skipped_nonempty
+                                    # 仅在发送的 tick 上取整；保持数值类型（GUI 按 number 解析），同时截短 JSON 中的浮点位数
+                                    progress_data = {
+                                        "current": effective_done,
+                                        "ordered_current": next_write_idx, "total": effective_total,
+                                        "percent": round(effective_done * 100 / max(1, effective_total), 2),
+                                        "total_chars": total_out_chars, "total_lines": total_lines,
+                                        "source_chars": total_source_chars, "source_lines": total_source_lines, 
+                                        "speed_chars": round(current_speed_chars, 1), "speed_lines": round(session_out_lines * inv_elapsed, 2),
+                                        "speed_gen": round(total_gen_tokens * inv_elapsed, 1), "speed_eval": round(total_prompt_tokens * inv_elapsed, 1),
+                                        "total_tokens": total_gen_tokens, "elapsed": round(elapsed_so_far, 2), "remaining": int(remaining_time)
+                                    }
+                                    pending_events.append(("JSON_PROGRESS", progress_data))
+                                    last_progress_time = now
+
+                            # Ordered write to file (consuming from results_buffer)
+                            # Write once per drained batch (or every OUTPUT_FLUSH_BLOCKS blocks); flush on a time cadence
+                            blocks_since_flush = 0
+                            out_chunks = []  # 本批待写文本，凑满后一次 join + write
+                            pending_cache = []  # 本批写出的缓存条目，批末一次性加入 translation_cache
+                            while next_write_idx < len(results_buffer) and results_buffer[next_write_idx] is not None:
+                                res = results_buffer[next_write_idx]
+                                results_buffer[next_write_idx] = None
+                                curr_disp = next_write_idx + 1
                         
-                        if res["success"]:
-                            # [Alignment Mode] Post-Processing
-                            # CRITICAL: Do NOT overwrite res["out_text"] with stripped version!
-                            # We need the tags in "out_text" for save_reconstructed to work at the end.
-                            # Only strip tags for the Preview/GUI.
-                            if args.alignment_mode:
-                                if not res.get("preview_text"):
-                                    res["preview_text"] = AlignmentHandler.process_result(res["out_text"])  
-                            else:
-                                res["preview_text"] = res.get("preview_text", res.get("out_text", ""))
-                            if next_write_idx not in preview_sent:
-                                safe_print_json(
-                                    "JSON_PREVIEW_BLOCK",
-                                    {"block": curr_disp, "src": res['src_text'], "output": res['preview_text']}
-                                )
-                                preview_sent.add(next_write_idx)
-
-                            warnings_list = res.get("warnings") or []
-                            retry_history = res.get("retry_history") or []
-                            last_retry_type = None
-                            if retry_history:
-                                try:
-                                    last_retry_type = retry_history[-1].get("type")
-                                except Exception:
+                                if res["success"]:
+                                    # [Alignment Mode] Post-Processing
+                                    # CRITICAL: Do NOT overwrite res["out_text"] with stripped version!
+                                    # We need the tags in "out_text" for save_reconstructed to work at the end.
+                                    # Only strip tags for the Preview/GUI.
+                                    if args.alignment_mode:
+                                        # 提前预览时已写回 preview_text（纯函数结果，空串也是有效结果），此处只补算缺失的情况
+                                        if "preview_text" not in res:
+                                            res["preview_text"] = AlignmentHandler.process_result(res["out_text"])  
+                                    else:
+                                        res["preview_text"] = res.get("preview_text", res.get("out_text", ""))
+                                    if emit_preview and next_write_idx not in preview_sent:
+                                        pending_events.append((
+                                            "JSON_PREVIEW_BLOCK",
+                                            {"block": curr_disp, "src": res['src_text'], "output": res['preview_text']}
+                                        ))
+                                        preview_sent.add(next_write_idx)
+
+                                    warnings_list = res.get("warnings") or []
+                                    retry_history = res.get("retry_history") or []
                                     last_retry_type = None
-                            if warnings_list:
-                                for warning in warnings_list:
-                                    if isinstance(warning, dict):
-                                        safe_print_json(
-                                            "JSON_WARNING",
-                                            {
-                                                "block": curr_disp,
-                                                "line": warning.get("line"),
-                                                "type": warning.get("type"),
-                                                "message": warning.get("message", ""),
-                                                "retry_count": len(retry_history),
-                                                "last_retry_type": last_retry_type,
-                                            },
-                                        )
+                                    if retry_history:
+                                        try:
+                                            last_retry_type = retry_history[-1].get("type")
+                                        except Exception:
+                                            last_retry_type = None
+                                    if warnings_list:
+                                        for warning in warnings_list:
+                                            if isinstance(warning, dict):
+                                                pending_events.append((
+                                                    "JSON_WARNING",
+                                                    {
+                                                        "block": curr_disp,
+                                                        "line": warning.get("line"),
+                                                        "type": warning.get("type"),
+                                                        "message": warning.get("message", ""),
+                                                        "retry_count": len(retry_history),
+                                                        "last_retry_type": last_retry_type,
+                                                    },
+                                                ))
                             
-                            if translation_cache:
-                                w_types = [w['type'] for w in res["warnings"]] if res["warnings"] else []
-                                translation_cache.add_block(next_write_idx, res["src_text"], res["preview_text"], w_types, res["cot"], res.get("retry_history", []))
+                                    if cache_enabled:
+                                        res_warnings = res["warnings"]
+                                        w_types = tuple(w['type'] for w in res_warnings) if res_warnings else _EMPTY_WARNINGS
+                                        pending_cache.append((next_write_idx, res["src_text"], res["preview_text"], w_types, res["cot"], res.get("retry_history", [])))
                             
-                            # Write to txt stream
-                            # 动态分隔符：如果后处理规则包含 ensure_double_newline，则 block 间使用双换行
-                            block_separator = "\n\n" if (use_double_newline_separator or args.mode == "chunk") else "\n"
-                            f_out.write(res["out_text"] + block_separator)
+                                    # Write to txt stream (block_separator 已在初始化时按规则确定)
+                                    out_chunks.append(res["out_text"])
+                                    out_chunks.append(block_separator)
                             
-                            if args.save_cot and res["cot"]:
-                                f_cot.write(f"[MURASAKI] ========== Block {curr_disp} ==========\n{res['raw_output']}\n\n")
-                        else:
-                            f_out.write(f"\n[Block {curr_disp} Failed]\n")
+                                    if args.save_cot and res["cot"]:
+                                        # 分段写入，避免为较长的 raw_output 拼接临时字符串
+                                        f_cot.write(_COT_HEADER_FMT(curr_disp))
+                                        f_cot.write(res["raw_output"])
+                                        f_cot.write("\n\n")
+                                else:
+                                    out_chunks.append(f"\n[Block {curr_disp} Failed]\n")
                         
-                        f_out.flush()
-                        # CRITICAL: Store in all_results for post-processing reconstruction
-                        all_results[next_write_idx] = res
-                        next_write_idx += 1
-
-            executor.shutdown(wait=True)
+                                blocks_since_flush += 1
+                                if blocks_since_flush >= OUTPUT_FLUSH_BLOCKS:
+                                    f_out.write("".join(out_chunks))
+                                    out_chunks.clear()
+                                    blocks_since_flush = 0
+                                # CRITICAL: Store in all_results for post-processing reconstruction
+                                # (only structured docs are rebuilt; keep just the fields reconstruction reads)
+                                if is_structured_doc:
+                                    all_results[next_write_idx] = (res.get('out_text'), res.get('success'))
+                                    if not res.get('success'):
+                                        any_failed = True
+                                next_write_idx += 1
+                            safe_print_json_batch(pending_events)
+                            if out_chunks:
+                                f_out.write("".join(out_chunks))
+                            # 崩溃时至多丢失最近 OUTPUT_FLUSH_SECS 秒的输出，续翻会重新翻译/从进度文件恢复这些块
+                            if time.monotonic() - last_output_flush >= OUTPUT_FLUSH_SECS:
+                                f_out.flush()
+                                if args.save_cot:
+                                    f_cot.flush()
+                                last_output_flush = time.monotonic()
+                            if pending_cache:
+                                translation_cache.add_blocks(pending_cache)
+                except KeyboardInterrupt:
+                    # 取消排队任务并先停止引擎，使进行中的请求立即失败，with 退出时的 join 不再阻塞
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    if engine:
+                        engine.stop_server()
+                    raise
+                finally:
+                    if prefetch_executor is not None:
+                        prefetch_executor.shutdown(wait=False, cancel_futures=True)
         
         # [Final Structured Save] 
         # 此操作在 f_out 关闭后执行，确保所有文本已落盘
@@ -2294,26 +3071,26 @@ def main():
                     raise ValueError(error_msg)
                 
                 print(f"[Final] Reconstructing structured document: {output_path}...")
-                from murasaki_translator.core.chunker import TextBlock
-                translated_blocks = []
-                for i in range(len(blocks)):
-                    res = all_results[i]
-                    if res and res.get('success'):
-                        # 构造 TextBlock 对象以满足 doc.save 的签名
-                        tb = TextBlock(id=i, prompt_text=res['out_text'])
-                        # 注入元数据以便 EPUB 精确回填
-                        if hasattr(blocks[i], 'metadata') and blocks[i].metadata:
-                            tb.metadata = blocks[i].metadata
-                        translated_blocks.append(tb)
-                    else:
-                        # Fallback: keep original text to maintain the sequence for structural injection
-                        print(f"[Warning] Block {i+1} missing or failed. Using source text.")
-                        tb = TextBlock(id=i, prompt_text=blocks[i].prompt_text)
-                        if hasattr(blocks[i], 'metadata') and blocks[i].metadata:
-                            tb.metadata = blocks[i].metadata
-                        translated_blocks.append(tb)
+                # 构造 TextBlock 对象以满足 doc.save 的签名，并注入元数据以便 EPUB 精确回填
+                # Fallback: failed blocks keep original text to maintain the sequence for structural injection
+                # 元数据按引用传递，不做拷贝
+                _TB = TextBlock
+                if not any_failed:
+                    # 完整性检查已保证无缺失块，全部成功时无需逐块判断回退
+                    translated_blocks = [
+                        _TB(id=i, prompt_text=res[0], metadata=src.metadata)
+                        for i, (res, src) in enumerate(zip(all_results, blocks))
+                    ]
+                else:
+                    translated_blocks = [
+                        _TB(id=i, prompt_text=res[0] if res and res[1] else src.prompt_text, metadata=src.metadata)
+                        for i, (res, src) in enumerate(zip(all_results, blocks))
+                    ]
+                    for i, res in enumerate(all_results):
+                        if not (res and res[1]):
+                            print(f"[Warning] Block {i+1} missing or failed. Using source text.")
                 
-                if args.alignment_mode and input_path.lower().endswith('.txt'):
+                if args.alignment_mode and is_txt:
                     print(f"[Debug] Invoking save_reconstructed. MapSize={len(structure_map)}, TotalLines={source_lines}, Blocks={len(translated_blocks)}")
                     AlignmentHandler.save_reconstructed(output_path, translated_blocks, structure_map, total_physical_lines=source_lines)
                 else:
@@ -2365,7 +3142,7 @@ def main():
 
         # [修复] 用户中断时也保存缓存，避免翻译数据丢失
         # [信号重入保护] 使用嵌套 try 防止第二次 Ctrl+C 中断保存过程
-        if 'translation_cache' in locals() and translation_cache and len(translation_cache.blocks) > 0:
+        if translation_cache and len(translation_cache.blocks) > 0:
             try:
                 m_name = os.path.basename(args.model) if args.model else "Unknown"
                 # 忽略第二次 Ctrl+C，确保缓存写入完成
@@ -2389,7 +3166,9 @@ def main():
 
         # [中断重建] 从 temp.jsonl 重建预览 txt 供用户查看已翻译内容
         try:
-            if 'temp_progress_path' in locals() and os.path.exists(temp_progress_path):
+            if temp_progress_file is not None and not temp_progress_file.closed:
+                temp_progress_file.flush()  # 落盘尚未 checkpoint 的进度
+            if os.path.exists(temp_progress_path):
                 rebuild_path = output_path + ".interrupted.txt"
                 with open(temp_progress_path, 'r', encoding='utf-8') as tf:
                     lines = tf.readlines()
@@ -2415,16 +3194,13 @@ def main():
         except Exception as e:
             print(f"[System] Failed to rebuild preview: {e}")
 
-        if 'executor' in locals():
-            executor.shutdown(wait=False, cancel_futures=True)
         if engine:
             engine.stop_server()
     except Exception as e:
         print(f"\n[System] Critical Error: {e}")
-        import traceback
         traceback.print_exc()
     finally:
-        if 'temp_progress_file' in locals():
+        if temp_progress_file is not None:
             try:
                 temp_progress_file.close()
             except: pass
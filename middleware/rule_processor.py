@@ -29,6 +29,17 @@ try:
 except ImportError:
     opencc = None
 
+# Built-in format regexes, compiled once at import instead of per block
+_DOUBLE_QUOTE_PAIR_RE = re.compile(r'"([^"]*)"')
+_SINGLE_QUOTE_PAIR_RE = re.compile(r"'([^']*)'")
+_ASCII_ELLIPSIS_RE = re.compile(r'\.{3,}')
+_CJK_ELLIPSIS_RE = re.compile(r'。{3,}')
+_SENTENCE_END_RE = re.compile(r'[。！？！？!?.…」』”"\']\s*$')
+_FULL_TO_HALF_PUNCT = str.maketrans({
+    '，': ',', '。': '.', '！': '!', '？': '?',
+    '：': ':', '；': ';', '（': '(', '）': ')'
+})
+
 PYTHON_SCRIPT_MAX_LEN = 8000
 PYTHON_SCRIPT_TIMEOUT_SEC = 0.5
 PYTHON_SCRIPT_BANNED_CALLS = {
@@ -608,7 +619,8 @@ class RuleProcessor:
             return text
 
         current_text = text
-        original_line_count = len(text.splitlines())
+        # Line count is only checked in strict mode; skip the full splitlines pass otherwise
+        original_line_count = len(text.splitlines()) if strict_line_count else 0
         
         for i, rule in enumerate(self.rules):
             if not rule.get('active', True):
@@ -727,28 +739,22 @@ class RuleProcessor:
             for line in text.splitlines():
                 # Only pair if count is even to avoid misalignment in lines with odd quotes
                 if line.count('"') > 0 and line.count('"') % 2 == 0:
-                    line = re.sub(r'"([^"]*)"', r'「\1」', line)
+                    line = _DOUBLE_QUOTE_PAIR_RE.sub(r'「\1」', line)
                 if line.count("'") > 0 and line.count("'") % 2 == 0:
-                    line = re.sub(r"'([^']*)'", r'『\1』', line)
+                    line = _SINGLE_QUOTE_PAIR_RE.sub(r'『\1』', line)
                 lines.append(line)
             return "\n".join(lines)
             
         elif format_name == 'ellipsis':
             # Standardize ellipsis formats to ……
             # Only handle 3 or more characters to avoid false positives with double periods
-            text = re.sub(r'\.{3,}', '……', text)
-            text = re.sub(r'。{3,}', '……', text)
+            text = _ASCII_ELLIPSIS_RE.sub('……', text)
+            text = _CJK_ELLIPSIS_RE.sub('……', text)
             return text
             
         elif format_name == 'full_to_half_punct':
-            # Full-width punctuation to half-width
-            table = {
-                '，': ',', '。': '.', '！': '!', '？': '?',
-                '：': ':', '；': ';', '（': '(', '）': ')'
-            }
-            for k, v in table.items():
-                text = text.replace(k, v)
-            return text
+            # Full-width punctuation to half-width (single-char map, one translate pass)
+            return text.translate(_FULL_TO_HALF_PUNCT)
             
         elif format_name == 'ensure_single_newline':
             if strict_line_count:
@@ -796,7 +802,7 @@ class RuleProcessor:
                 # 2. Previous line doesn't end with sentence-final punctuation
                 # Use rstrip to ignore trailing spaces for punc check
                 is_short = len(current_line.strip()) < 15
-                ends_with_punc = re.search(r'[。！？！？!?.…」』”"\']\s*$', current_line.rstrip())
+                ends_with_punc = _SENTENCE_END_RE.search(current_line.rstrip())
                 
                 if is_short and not ends_with_punc:
                     # Merge with a space if it's alphanumeric, or directly if it's CJK
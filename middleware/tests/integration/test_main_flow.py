@@ -7,6 +7,7 @@ from murasaki_translator.core.parser import ResponseParser
 from murasaki_translator.core.prompt import PromptBuilder
 from murasaki_translator.core.quality_checker import WarningType
 from rule_processor import RuleProcessor
+import murasaki_translator.main as main_module
 from murasaki_translator.main import translate_block_with_retry
 
 
@@ -15,6 +16,7 @@ class FakeEngine:
         self._responses = list(responses)
         self.calls = 0
         self.messages = []
+        self.temperatures = []
 
     def chat_completion(
         self,
@@ -30,6 +32,7 @@ class FakeEngine:
         idx = min(self.calls, len(self._responses) - 1)
         self.calls += 1
         self.messages.append(messages)
+        self.temperatures.append(temperature)
         resp = self._responses[idx]
         if stream_callback and resp:
             stream_callback(resp[:1])
@@ -84,6 +87,7 @@ def _run_flow(original_src, responses, args, strict_mode=False, glossary=None):
         protector=None,
     )
     result["_engine_messages"] = engine.messages
+    result["_engine_temperatures"] = engine.temperatures
     return result
 
 
@@ -105,6 +109,62 @@ def test_main_flow_line_check_retry():
     assert result["out_text"].splitlines() == ["x", "y"]
 
 
+@pytest.mark.integration
+def test_main_flow_repeated_output_escalates_temperature():
+    args = _make_args(max_retries=2, line_check=True, line_tolerance_abs=0, line_tolerance_pct=0.0)
+    result = _run_flow("a\nb", ["x", "x", "x\ny"], args)
+    temps = result["_engine_temperatures"]
+    assert len(temps) == 3
+    # Second retry skips one step because the first retry repeated the failed output
+    assert temps[1] == pytest.approx(0.8)
+    assert temps[2] == pytest.approx(1.0)
+    assert result["out_text"].splitlines() == ["x", "y"]
+
+
+class _ChunkedThinkEngine(FakeEngine):
+    def chat_completion(self, messages, stream_callback=None, **kwargs):
+        for piece in ["<thi", "nk>abc", "</th", "ink>out"]:
+            stream_callback(piece)
+        return "<think>abc</think>out", {}
+
+
+def _stream_think_deltas(capsys):
+    args = _make_args(max_retries=0)
+    translate_block_with_retry(
+        block_idx=0,
+        original_src_text="src",
+        processed_src_text="src",
+        args=args,
+        engine=_ChunkedThinkEngine([]),
+        prompt_builder=PromptBuilder({}),
+        response_parser=ResponseParser(),
+        post_processor=RuleProcessor([]),
+        glossary={},
+        stdout_lock=threading.Lock(),
+        strict_mode=False,
+        protector=None,
+    )
+    return [
+        line.split(":", 1)[1]
+        for line in capsys.readouterr().out.splitlines()
+        if line.startswith("JSON_THINK_DELTA:")
+    ]
+
+
+@pytest.mark.integration
+def test_main_flow_think_delta_streaming(capsys, monkeypatch):
+    # Zero coalescing window: every forwarded chunk is emitted on its own
+    monkeypatch.setattr(main_module, "THINK_DELTA_FLUSH_SECS", 0.0)
+    assert _stream_think_deltas(capsys) == ['"nk>abc"', '"</th"']
+
+
+@pytest.mark.integration
+def test_main_flow_think_delta_coalesced_within_window(capsys, monkeypatch):
+    monkeypatch.setattr(main_module, "THINK_DELTA_FLUSH_SECS", 60.0)
+    # Pending chunks are flushed once the completion returns
+    assert _stream_think_deltas(capsys) == ['"nk>abc</th"']
+
+
 @pytest.mark.integration
 def test_main_flow_strict_line_check_retry():
     args = _make_args(max_retries=1)
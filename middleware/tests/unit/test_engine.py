@@ -1,4 +1,5 @@
 import subprocess
+import threading
 from pathlib import Path
 
 import pytest
@@ -98,3 +99,25 @@ def test_start_server_large_batch_uses_ctx_cap(monkeypatch, tmp_path):
     cmd = captured["cmd"]
     assert "-b" in cmd and "512" in cmd
     assert "-ub" in cmd and "512" in cmd
+
+
+@pytest.mark.unit
+def test_start_server_skips_spawn_when_cancelled(monkeypatch, tmp_path):
+    server_path = tmp_path / "llama-server.exe"
+    model_path = tmp_path / "model.gguf"
+    server_path.write_text("", encoding="utf-8")
+    model_path.write_text("", encoding="utf-8")
+
+    engine = InferenceEngine(server_path=str(server_path), model_path=str(model_path))
+    spawned = []
+    monkeypatch.setattr(subprocess, "Popen", lambda cmd, stdout=None, stderr=None: spawned.append(cmd))
+    monkeypatch.setattr(engine, "_wait_for_ready", lambda *args, **kwargs: spawned.append("wait"))
+    monkeypatch.chdir(tmp_path)
+
+    cancel = threading.Event()
+    cancel.set()
+    engine.start_server(cancel=cancel)
+
+    assert spawned == []
+    assert engine.process is None
+    assert not (tmp_path / "server.log").exists()
@@ -1,4 +1,9 @@
-﻿import json
+﻿import argparse
+import io
+import json
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 
 import pytest
@@ -6,7 +11,15 @@ import pytest
 from murasaki_translator.main import (
     load_glossary,
     load_rules,
+    _add_unique_rules,
+    _resolve_glossary_path,
     load_existing_output,
+    truncate_existing_output,
+    _wait_while_paused,
+    _source_text_stats,
+    _prepare_while_server_starts,
+    _BlockPrefetcher,
+    _load_rebuild_cache,
     get_missed_terms,
     build_retry_feedback,
     calculate_skip_blocks,
@@ -16,6 +29,21 @@ from murasaki_translator.main import (
     _parse_protect_pattern_payload,
     _merge_protect_patterns,
     _allow_text_protect,
+    _calculate_kana_ratio,
+    _glossary_terms_in,
+    has_nvidia_gpu,
+    nvidia_compute_capability,
+    _config_fingerprint,
+    _legacy_config_fingerprint,
+    _estimate_max_parallel_slots,
+    run_single_block_daemon,
+    _get_single_block_engine,
+    _get_single_block_config,
+    _dumps_json_line,
+    _dumps_json_bytes,
+    _loads_json_line,
+    safe_print_json,
+    safe_print_json_batch,
 )
 from murasaki_translator.core.chunker import TextBlock
 
@@ -38,6 +66,29 @@ def test_load_glossary_list(tmp_path: Path):
     assert data["b"] == "B"
 
 
+@pytest.mark.unit
+def test_resolve_glossary_path(tmp_path: Path, monkeypatch):
+    path = tmp_path / "g.json"
+    path.write_text("{}", encoding="utf-8")
+    assert _resolve_glossary_path(str(path)) == str(path)
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "glossaries").mkdir()
+    (tmp_path / "glossaries" / "local.json").write_text("{}", encoding="utf-8")
+    assert _resolve_glossary_path("local.json") == str(Path("glossaries") / "local.json")
+    assert _resolve_glossary_path("missing.json") is None
+
+
+@pytest.mark.unit
+def test_add_unique_rules():
+    rules = [{"type": "regex", "pattern": "a", "active": True}, {"type": "format", "pattern": "number_fixer"}]
+    _add_unique_rules(rules, ["kana_fixer", "number_fixer", "kana_fixer"])
+    assert [r["pattern"] for r in rules] == ["a", "number_fixer", "kana_fixer"]
+
+    _add_unique_rules(rules, ("ruby_cleaner",), pos="prepend")
+    assert rules[0] == {"type": "format", "pattern": "ruby_cleaner", "active": True}
+
+
 @pytest.mark.unit
 def test_load_rules_invalid_json(tmp_path: Path):
     path = tmp_path / "rules.json"
@@ -77,6 +128,67 @@ def test_load_existing_output_lines(tmp_path: Path):
     assert content == ["a", "", "b"]
 
 
+@pytest.mark.unit
+def test_load_existing_output_count_only(tmp_path: Path):
+    path = tmp_path / "out.txt"
+    path.write_text("a\n\nb\n", encoding="utf-8")
+    lines, content, ok = load_existing_output(str(path), keep_content=False)
+    assert (lines, content, ok) == (3, [], True)
+
+    path.write_text("Translation Summary\n====================\n", encoding="utf-8")
+    assert load_existing_output(str(path), keep_content=False) == (-1, [], False)
+
+
+@pytest.mark.unit
+def test_load_existing_output_streams_lines(tmp_path: Path):
+    path = tmp_path / "out.txt"
+    path.write_bytes("a\r\n\r\nb\r\n".encode("utf-8"))
+    assert load_existing_output(str(path)) == (3, ["a", "", "b"], True)
+
+    path.write_bytes(b"")
+    assert load_existing_output(str(path)) == (0, [], True)
+
+
+@pytest.mark.unit
+def test_truncate_existing_output(tmp_path: Path):
+    path = tmp_path / "out.txt"
+    path.write_bytes(b"a\n\nb\npartial")
+    truncate_existing_output(str(path), 3)
+    assert path.read_bytes() == b"a\n\nb\n"
+
+    path.write_bytes(b"a\nb")
+    truncate_existing_output(str(path), 2)
+    assert path.read_bytes() == b"a\n"
+
+
+@pytest.mark.unit
+def test_resume_drops_torn_final_line(tmp_path: Path):
+    path = tmp_path / "out.txt"
+    # 第二块只写了一半就崩溃：末行没有换行符
+    path.write_bytes("块一\n\n块二前半".encode("utf-8"))
+    assert load_existing_output(str(path)) == (2, ["块一", ""], True)
+    assert load_existing_output(str(path), keep_content=False) == (2, [], True)
+
+    truncate_existing_output(str(path), 3)
+    assert path.read_bytes() == "块一\n\n".encode("utf-8")
+
+
+@pytest.mark.unit
+def test_load_rebuild_cache(tmp_path: Path):
+    from murasaki_translator.core.cache import TranslationCache
+
+    output_path = tmp_path / "out.txt"
+    cache = TranslationCache(str(output_path), source_path="src.txt")
+    cache.add_block(0, "a", "A")
+    cache.add_block(1, "b", "B")
+    assert cache.save() is True
+
+    source_path, cached_output, blocks = _load_rebuild_cache(cache.cache_path)
+    assert source_path == "src.txt"
+    assert cached_output == str(output_path)
+    assert [(b["index"], b["dst"]) for b in blocks] == [(0, "A"), (1, "B")]
+
+
 @pytest.mark.unit
 def test_get_missed_terms_and_feedback():
     missed = get_missed_terms("foo bar", "foo", {"foo": "FOO", "bar": "BAR"})
@@ -85,6 +197,14 @@ def test_get_missed_terms_and_feedback():
     assert "BAR" in feedback
 
 
+@pytest.mark.unit
+def test_glossary_terms_in_keeps_glossary_order():
+    glossary = {"魔法使い": "魔法师", "A": "a", "剣士": "剑士", "魔王": "魔王", "竜": "龙"}
+    found = _glossary_terms_in("剣士と魔法使いが竜を倒した", glossary)
+    assert list(found.items()) == [("魔法使い", "魔法师"), ("剣士", "剑士")]
+    assert _glossary_terms_in("", glossary) == {}
+
+
 @pytest.mark.unit
 def test_calculate_skip_blocks():
     blocks = [
@@ -94,6 +214,7 @@ def test_calculate_skip_blocks():
     ]
     skipped = calculate_skip_blocks(blocks, existing_lines=2, is_chunk_mode=False)
     assert skipped == 1
+    assert calculate_skip_blocks(blocks, existing_lines=2, line_counts=[2, 2, 2]) == 1
 
 
 @pytest.mark.unit
@@ -106,6 +227,15 @@ def test_calculate_skip_blocks_chunk_mode():
     assert skipped == 0
 
 
+@pytest.mark.unit
+def test_calculate_kana_ratio_ignores_unicode_whitespace():
+    ratio, kana, effective = _calculate_kana_ratio("かな\u3000漢字 ab\n\tカ")
+    assert (kana, effective) == (3, 7)
+    assert ratio == pytest.approx(3 / 7)
+    assert _calculate_kana_ratio(" \u3000\n") == (0.0, 0, 0)
+    assert _calculate_kana_ratio(None) == (0.0, 0, 0)
+
+
 @pytest.mark.unit
 def test_normalize_anchor_stream():
     text = "＠ｉｄ＝２＠\nhello\n＠ｅｎｄ＝２＠"
@@ -133,6 +263,8 @@ def test_parse_protect_pattern_payload():
 def test_merge_protect_patterns():
     merged = _merge_protect_patterns(["a", "b"], ["b", "c"], ["a"])
     assert merged == ["b", "c"]
+    # additions are deduplicated in order; empty patterns are skipped
+    assert _merge_protect_patterns(None, ["x", "", "y", "x"], []) == ["x", "y"]
 
 
 @pytest.mark.unit
@@ -162,3 +294,342 @@ def test_allow_text_protect_alignment_mode_single_block():
 )
 def test_extract_interrupted_preview_text(payload, expected):
     assert _extract_interrupted_preview_text(payload) == expected
+
+
+@pytest.mark.unit
+def test_has_nvidia_gpu_honors_forced_backend(monkeypatch):
+    def _no_probe(*args, **kwargs):
+        raise AssertionError("nvidia-smi should not be probed")
+
+    monkeypatch.setattr("murasaki_translator.main.subprocess.run", _no_probe)
+    for backend, expected in (("cuda", True), ("Vulkan", False)):
+        monkeypatch.setenv("MURASAKI_FORCE_BACKEND", backend)
+        has_nvidia_gpu.cache_clear()
+        assert has_nvidia_gpu() is expected
+    has_nvidia_gpu.cache_clear()
+
+
+@pytest.mark.unit
+def test_nvidia_compute_capability_takes_lowest_gpu(monkeypatch):
+    monkeypatch.setenv("MURASAKI_FORCE_BACKEND", "cuda")
+    monkeypatch.setattr(
+        "murasaki_translator.main._query_nvidia_smi",
+        lambda field: "8.6\n7.5\n" if field == "compute_cap" else None,
+    )
+    has_nvidia_gpu.cache_clear()
+    nvidia_compute_capability.cache_clear()
+    assert nvidia_compute_capability() == 7.5
+
+    monkeypatch.setenv("MURASAKI_FORCE_BACKEND", "vulkan")
+    has_nvidia_gpu.cache_clear()
+    nvidia_compute_capability.cache_clear()
+    assert nvidia_compute_capability() is None
+    has_nvidia_gpu.cache_clear()
+    nvidia_compute_capability.cache_clear()
+
+
+@pytest.mark.unit
+def test_config_fingerprint_is_stable_and_order_independent():
+    payload = {"chunk_size": 1000, "model": "m.gguf", "seed": None, "text_protect": False}
+    reordered = dict(reversed(list(payload.items())))
+    fingerprint = _config_fingerprint(payload)
+    assert len(fingerprint) == 16
+    assert fingerprint == _config_fingerprint(reordered)
+    assert fingerprint != _config_fingerprint({**payload, "seed": 0})
+    assert _legacy_config_fingerprint(payload) == _legacy_config_fingerprint(reordered)
+
+
+@pytest.mark.unit
+def test_estimate_max_parallel_slots():
+    model_bytes = 5 * 1024 ** 3
+    assert _estimate_max_parallel_slots(24576, model_bytes, 8192) == 16
+    assert _estimate_max_parallel_slots(8192, model_bytes, 8192) == 1
+    # 量化 KV Cache 单槽占用更小，可容纳更多并发
+    assert _estimate_max_parallel_slots(8192, model_bytes, 8192, "q8_0") == 3
+    assert _estimate_max_parallel_slots(4096, model_bytes, 8192) == 1
+
+
+@pytest.mark.unit
+def test_run_single_block_daemon_merges_requests(monkeypatch, capsys):
+    seen = []
+    monkeypatch.setattr(
+        "murasaki_translator.main.translate_single_block",
+        lambda args: seen.append((args.single_block, args.file, args.json_output, args.ctx)),
+    )
+    stdin = '{"single_block": "a", "file": "x.srt"}\n\nnot json\n{"single-block": "b", "ctx": 2048}\n'
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+
+    base_args = argparse.Namespace(single_block=None, file=None, json_output=False, ctx=4096)
+    run_single_block_daemon(base_args)
+
+    assert seen == [("a", "x.srt", True, 4096), ("b", None, True, 2048)]
+    assert base_args.single_block is None
+    out = capsys.readouterr().out
+    assert out.count("JSON_RESULT:") == 1
+    assert "Invalid request" in out
+
+
+@pytest.mark.unit
+def test_run_single_block_daemon_validates_and_survives_errors(monkeypatch, capsys):
+    seen = []
+
+    def fake_translate(args):
+        if args.single_block == "boom":
+            raise TypeError("unhashable type: 'list'")
+        seen.append((args.single_block, args.ctx, args.strict_mode))
+
+    monkeypatch.setattr("murasaki_translator.main.translate_single_block", fake_translate)
+    stdin = "\n".join([
+        '{"single_block": "a", "ctx": "2048"}',
+        '{"single_block": "b", "unknown_key": 1}',
+        '{"single_block": "c", "ctx": "many"}',
+        '{"single_block": "d", "strict_mode": "bogus"}',
+        '{"single_block": "e", "rules_pre": ["x.json"]}',
+        '{"single_block": "boom"}',
+        '{"single_block": "f", "strict-mode": "all"}',
+    ]) + "\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--single-block")
+    parser.add_argument("--ctx", type=int, default=4096)
+    parser.add_argument("--strict-mode", default="subs", choices=["off", "subs", "all"])
+    parser.add_argument("--rules-pre")
+    parser.add_argument("--json-output", action="store_true")
+    base_args = parser.parse_args([])
+    run_single_block_daemon(base_args, parser)
+
+    assert seen == [("a", 2048, "subs"), ("f", 4096, "all")]
+    results = [json.loads(line.split(":", 1)[1]) for line in capsys.readouterr().out.splitlines()
+               if line.startswith("JSON_RESULT:")]
+    assert [r["success"] for r in results] == [False] * 5
+    assert "unknown option" in results[0]["error"]
+    assert "invalid value for ctx" in results[1]["error"]
+    assert "invalid choice for strict_mode" in results[2]["error"]
+    assert "single value" in results[3]["error"]
+    assert "unhashable" in results[4]["error"]
+
+
+@pytest.mark.unit
+def test_get_single_block_engine_reuses_running_server(monkeypatch):
+    events = []
+
+    class FakeProcess:
+        def poll(self):
+            return None
+
+    class FakeEngine:
+        def __init__(self, **kwargs):
+            self.no_spawn = kwargs["no_spawn"]
+            self.n_ctx = kwargs["n_ctx"]
+            self.process = None
+
+        def start_server(self):
+            events.append(("start", self.n_ctx))
+            if not self.no_spawn:
+                self.process = FakeProcess()
+
+        def stop_server(self):
+            events.append(("stop", self.n_ctx))
+            self.process = None
+
+    monkeypatch.setattr("murasaki_translator.main.InferenceEngine", FakeEngine)
+    monkeypatch.setattr("murasaki_translator.main._ENGINE_CACHE", {})
+
+    def make_args(ctx, no_spawn=False):
+        return argparse.Namespace(server="s", model="m", gpu_layers=-1, ctx=ctx, no_server_spawn=no_spawn)
+
+    first = _get_single_block_engine(make_args(4096))
+    assert _get_single_block_engine(make_args(4096)) is first
+    second = _get_single_block_engine(make_args(8192))
+    assert second is not first
+    assert events == [("start", 4096), ("stop", 4096), ("start", 8192)]
+
+    client = _get_single_block_engine(make_args(8192, no_spawn=True))
+    assert client is not _get_single_block_engine(make_args(8192, no_spawn=True))
+
+
+@pytest.mark.unit
+def test_get_single_block_config_reuses_until_rules_change(tmp_path: Path):
+    import os
+
+    rules_post = tmp_path / "post.json"
+    rules_post.write_text(json.dumps([{"type": "format", "pattern": "clean_empty", "active": True}]), encoding="utf-8")
+    args = argparse.Namespace(
+        file="story.srt", rules_pre=None, rules_post=str(rules_post), protect_patterns=None,
+        alignment_mode=False, text_protect=True, single_block="a", strict_mode="subs",
+    )
+    config = _get_single_block_config(args)
+    assert config.is_sub and config.enforce_strict_alignment
+    assert config.text_protect is False
+    assert config.notices == ("[TextProtect] Disabled for non-txt input.",)
+    assert _get_single_block_config(args) is config
+
+    rules_post.write_text(json.dumps([]), encoding="utf-8")
+    stat = rules_post.stat()
+    os.utime(rules_post, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    updated = _get_single_block_config(args)
+    assert updated is not config
+    assert updated.post_processor.rules == []
+
+
+@pytest.mark.unit
+def test_dumps_json_line_is_single_line_json():
+    result = {"success": True, "src": "一行\n二行", "dst": "第一行\n第二行", "cot": ""}
+    dumped = _dumps_json_line(result)
+    assert "\n" not in dumped
+    assert "第一行" in dumped
+    assert json.loads(dumped) == result
+
+
+@pytest.mark.unit
+def test_loads_json_line_accepts_bytes_and_stdlib_output():
+    assert _loads_json_line('{"block_idx": 1, "out_text": "訳"}\n'.encode("utf-8")) == {"block_idx": 1, "out_text": "訳"}
+    nan_line = json.dumps({"ratio": float("nan")})
+    assert _loads_json_line(nan_line)["ratio"] != _loads_json_line(nan_line)["ratio"]
+    with pytest.raises(ValueError):
+        _loads_json_line(b'{"block_idx": 2, "out_te')
+
+
+@pytest.mark.unit
+def test_safe_print_json_batch_matches_individual_events(capsys):
+    events = [
+        ("JSON_PREVIEW_BLOCK", {"block": 1, "src": "あ", "output": "A"}),
+        ("JSON_WARNING", {"block": 1, "line": 2, "type": "kana_residue"}),
+    ]
+    for prefix, data in events:
+        safe_print_json(prefix, data)
+    individual = capsys.readouterr().out
+
+    safe_print_json_batch(events)
+    assert capsys.readouterr().out == individual
+
+    safe_print_json_batch([])
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.unit
+def test_wait_while_paused_returns_after_pause_file_removed(tmp_path: Path):
+    pause_file = tmp_path / "out.txt.pause"
+    _wait_while_paused(str(pause_file), poll_interval=0.01)  # not paused: returns immediately
+
+    pause_file.write_text("", encoding="utf-8")
+    timer = threading.Timer(0.05, pause_file.unlink)
+    timer.start()
+    _wait_while_paused(str(pause_file), poll_interval=0.01)
+    timer.join()
+    assert not pause_file.exists()
+
+
+@pytest.mark.unit
+def test_source_text_stats_skips_blank_items():
+    items = [{"text": "ab"}, {"text": ""}, {"text": " \u3000\t"}, {"text": " c "}]
+    assert _source_text_stats(items) == (2, 5)
+    assert _source_text_stats([]) == (0, 0)
+
+
+@pytest.mark.unit
+def test_dumps_json_bytes_matches_line_serializer():
+    result = {"block_idx": 3, "out_text": "訳文\n二行目", "warnings": [], "usage": None}
+    dumped = _dumps_json_bytes(result)
+    assert isinstance(dumped, bytes)
+    assert dumped == _dumps_json_line(result).encode("utf-8")
+    assert _loads_json_line(dumped) == result
+
+
+class _BlockingStartEngine:
+    def __init__(self, start_error=None):
+        self.released = threading.Event()
+        self.stopped = False
+        self.spawned = False
+        self.finished = threading.Event()
+        self.start_error = start_error
+
+    def start_server(self, cancel=None):
+        try:
+            self.released.wait(5)
+            if self.start_error:
+                raise self.start_error
+            if cancel is None or not cancel.is_set():
+                self.spawned = True
+        finally:
+            self.finished.set()
+
+    def stop_server(self):
+        self.stopped = True
+        self.released.set()
+
+
+@pytest.mark.unit
+def test_prepare_while_server_starts_fails_fast_on_prepare_error():
+    engine = _BlockingStartEngine()
+
+    def prepare():
+        raise ValueError("bad input")
+
+    started = time.monotonic()
+    with pytest.raises(ValueError, match="bad input"):
+        _prepare_while_server_starts(engine, prepare)
+    assert time.monotonic() - started < 1.0
+    assert engine.stopped is True
+
+
+@pytest.mark.unit
+def test_prepare_while_server_starts_cancels_spawn_when_prepare_fails_early():
+    engine = _BlockingStartEngine()
+    # stop_server 时尚无进程可停：启动线程仍阻塞在创建进程之前
+    engine.stop_server = lambda: setattr(engine, "stopped", True)
+
+    def prepare():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError, match="bad input"):
+        _prepare_while_server_starts(engine, prepare)
+    assert engine.stopped is True
+    engine.released.set()
+    assert engine.finished.wait(5)
+    assert engine.spawned is False
+
+
+@pytest.mark.unit
+def test_prepare_while_server_starts_waits_and_propagates_start_error():
+    engine = _BlockingStartEngine()
+    threading.Timer(0.05, engine.released.set).start()
+    assert _prepare_while_server_starts(engine, lambda: ("items", 3)) == ("items", 3)
+    assert engine.stopped is False
+
+    failing = _BlockingStartEngine(start_error=TimeoutError("not ready"))
+    failing.released.set()
+    with pytest.raises(TimeoutError, match="not ready"):
+        _prepare_while_server_starts(failing, lambda: ())
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.mark.unit
+def test_block_prefetcher_skips_claimed_blocks_and_keeps_going():
+    prepared = []
+
+    def prepare(idx):
+        prepared.append(idx)
+        return f"src{idx}", None
+
+    prefetcher = _BlockPrefetcher(_InlineExecutor(), prepare, depth=1, queue=list(range(10)), start=2)
+    prefetcher.schedule()
+    assert prepared == [2]
+    assert prefetcher.claim(0) is None
+    assert prefetcher.claim(1) is None
+    # 块 3 在其预取提交前已被 worker 领取并就地处理
+    assert prefetcher.claim(3) is None
+    assert prefetcher.claim(2).result() == ("src2", None)
+
+    for idx in range(4, 10):
+        prefetcher.schedule()
+        assert prefetcher.claim(idx).result() == (f"src{idx}", None)
+    prefetcher.schedule()
+    assert prepared == [2, 4, 5, 6, 7, 8, 9]
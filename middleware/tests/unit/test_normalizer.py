@@ -0,0 +1,17 @@
+﻿import pytest
+
+from murasaki_translator.fixer.normalizer import Normalizer
+
+
+@pytest.mark.unit
+def test_normalizer_converts_width():
+    text = "\uff21\uff42\uff11 \uff71\uff72\uff9e \u304b\u3099"
+    out = Normalizer.normalize(text)
+    assert out == "Ab1 \u30a2\u30a4\u309b \u304c"
+
+
+@pytest.mark.unit
+def test_normalizer_ascii_passthrough():
+    text = "{\\pos(1,2)}Hello <i>world</i>"
+    assert Normalizer.normalize(text) is text
+    assert Normalizer.normalize("") == ""
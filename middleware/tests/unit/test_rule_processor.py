@@ -17,6 +17,18 @@ def test_rule_processor_basic_replace_regex_format():
     assert out == "bar baz\u2026\u2026"
 
 
+@pytest.mark.unit
+def test_rule_processor_builtin_punctuation_formats():
+    quotes = RuleProcessor([{"type": "format", "pattern": "smart_quotes", "active": True}])
+    assert quotes.process('"a" \'b\'') == "\u300ca\u300d \u300eb\u300f"
+
+    half = RuleProcessor([{"type": "format", "pattern": "full_to_half_punct", "active": True}])
+    assert half.process("\u4f60\u597d\uff0c\u4e16\u754c\uff01\uff08\u7b11\uff09") == "\u4f60\u597d,\u4e16\u754c!(\u7b11)"
+
+    merge = RuleProcessor([{"type": "format", "pattern": "merge_short_lines", "active": True}])
+    assert merge.process("\u77ed\n\u7d9a\u304d\u3002\n\u6b21") == "\u77ed\u7d9a\u304d\u3002\n\u6b21"
+
+
 @pytest.mark.unit
 def test_rule_processor_strict_line_count_skips_changes():
     rules = [
@@ -39,3 +39,12 @@ def test_text_protector_avoids_placeholder_collision():
     assert placeholder != "@P1@"
     restored = protector.restore(protected)
     assert restored == text
+
+
+@pytest.mark.unit
+def test_text_protector_restore_trailing_space_by_cleaning_mode():
+    for aggressive, expected in ((False, "<b>x</b> y"), (True, "<b>x</b>y")):
+        protector = TextProtector(patterns=[r"<[^>]+>"], aggressive_cleaning=aggressive)
+        protected = protector.protect("<b>x</b>y")
+        spaced = protected.replace("@P2@", "@ P 2 @ ")
+        assert protector.restore(spaced) == expected
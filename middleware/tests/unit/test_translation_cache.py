@@ -47,6 +47,23 @@ def test_translation_cache_replace_block(tmp_path: Path):
     assert block.dst == "A2"
 
 
+@pytest.mark.unit
+def test_translation_cache_add_blocks_batch(tmp_path: Path):
+    output_path = tmp_path / "out.txt"
+    cache = TranslationCache(str(output_path))
+    cache.add_block(0, "a", "A")
+    added = cache.add_blocks([
+        (0, "a2", "A2", ["w1"], "cot", [{"type": "empty"}]),
+        (1, "b", "B"),
+    ])
+    assert [b.index for b in added] == [0, 1]
+    assert len(cache.blocks) == 2
+    assert cache.get_block(0).dst == "A2"
+    assert cache.get_block(0).warnings == ["w1"]
+    assert cache.get_block(1).retry_history == []
+    assert cache.add_blocks([]) == []
+
+
 @pytest.mark.unit
 def test_translation_cache_stats_and_export(tmp_path: Path):
     output_path = tmp_path / "out.txt"